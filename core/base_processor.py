@@ -1,37 +1,96 @@
-from agno.agent import Agent
-from kbx.common.utils import doc_element_to_markdown
-from kbx.common.prompt import get_category_prompts
-from typing import Iterator, List, Dict
-from kbx.common.types import DocData
-from textwrap import dedent
 import os
 import time
 import json
-from typing import List, Dict, Any
+import hashlib
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Tuple
 import yaml
 
-from kbx.common.utils import doc_data_to_markdown
+from kbx.common.utils import doc_data_to_markdown, doc_element_to_markdown, generate_new_id
+from kbx.common.types import DocData, KBXError
 from kbx.parser.parser_factory import SmartParser
-from kbx.common.types import DocFileType, KBXError
 from kbx.common.constants import DEFAULT_USER_ID
 from kbx.kbx import KBX
 from kbx.knowledge_base.types import (
     KBCreationConfig,
-    SplitterConfig,
-    QueryConfig,
-    VectorKeywordIndexConfig,
-    QueryResults,
     Chunk
 )
-from kbx.common.utils import generate_new_id
-from kbx.rerank.types import RerankConfig
 from kbx.parser.types import DocParseConfig
-from kbx.agent.types import AgentConfig
 from kbx.common.logging import logger
 
 from kbx.splitter.splitter_factory import get_splitter
 from kbx.splitter.types import SplitterConfig
 
+from core.llm_cache import LLMCache
+from core.token_counter import TokenCountingService
+
+# 进程级共享状态：KBX只初始化一次，模型客户端与token计数服务按模型名称复用
+_KBX_LOCK = threading.RLock()
+_kbx_initialized_configs = set()
+_model_clients: Dict[str, Tuple[Any, Any]] = {}
+_token_counters: Dict[str, TokenCountingService] = {}
+
+
+def ensure_kbx_initialized(kbx_yaml_file: str = None, ai_models_yaml_file: str = None):
+    """在当前进程中初始化KBX并注册模型，相同的配置文件只会执行一次
+
+    Args:
+        kbx_yaml_file: KBX配置文件路径
+        ai_models_yaml_file: 模型配置文件路径
+    """
+    key = (kbx_yaml_file, ai_models_yaml_file)
+    if key in _kbx_initialized_configs:
+        return
+    with _KBX_LOCK:
+        if key in _kbx_initialized_configs:
+            return
+        if kbx_yaml_file:
+            KBX.init(config=kbx_yaml_file)
+        if ai_models_yaml_file:
+            KBX.register_ai_models_from_conf(
+                model_configs=ai_models_yaml_file, overwrite=True)
+        # 重新注册模型后旧的客户端可能已失效
+        _model_clients.clear()
+        _kbx_initialized_configs.add(key)
+
+
+def get_model_client(llm_model: str) -> Tuple[Any, Any]:
+    """获取进程内共享的模型配置和客户端
+
+    Args:
+        llm_model: 大模型名称
+
+    Returns:
+        Tuple[Any, Any]: (模型配置, 模型客户端)
+    """
+    client = _model_clients.get(llm_model)
+    if client is None:
+        with _KBX_LOCK:
+            client = _model_clients.get(llm_model)
+            if client is None:
+                client = _model_clients[llm_model] = KBX.get_ai_model_config_and_client(llm_model)
+    return client
+
+
+def get_shared_token_counter(llm_model: str = None) -> TokenCountingService:
+    """获取进程内共享的token计数服务
+
+    Args:
+        llm_model: 大模型名称，用于选择对应的分词器
+
+    Returns:
+        TokenCountingService: token计数服务，可直接作为token计数函数调用
+    """
+    token_counter = _token_counters.get(llm_model)
+    if token_counter is None:
+        with _KBX_LOCK:
+            token_counter = _token_counters.get(llm_model)
+            if token_counter is None:
+                token_counter = _token_counters[llm_model] = TokenCountingService(llm_model)
+    return token_counter
+
 
 class BaseProcessor:
     """基础文档处理器
@@ -46,24 +105,27 @@ class BaseProcessor:
     def __init__(self,
                  kb_name: str = "标书知识库",
                  kb_description: str = "这是一个运维知识库，doc 格式",
-                 llm_model: str = 'volcengine-deepseek-v3'):
+                 llm_model: str = 'volcengine-deepseek-v3',
+                 enable_llm_cache: bool = False):
         """初始化基础文档处理器
 
         Args:
             kb_name: 知识库名称
             kb_description: 知识库描述
+            llm_model: 大模型名称
+            enable_llm_cache: 是否启用大模型响应的磁盘缓存
         """
         self._kb_name = kb_name
         self._kb_description = kb_description
         self._kb = None
+        self._llm_model = llm_model
         self.kbx_yaml_file = None
         self.ai_models_yaml_file = None
         # self.root_dir = os.path.join(os.path.dirname(
         #     os.path.abspath(__file__)), '../..')
         self.root_dir = os.path.dirname(os.path.abspath(__file__))
         self._kbx_setup()
-        self._client_config, self._client = KBX.get_ai_model_config_and_client(
-            llm_model)
+        self._client_config, self._client = get_model_client(llm_model)
 
         # 按模型max_context_len来设置chunk_size
         # MIN_CHUNK_SIZE = 1024 * 4
@@ -71,13 +133,14 @@ class BaseProcessor:
         # self.chunk_size = max(
         #     min(self._client_config.max_context_len - 1024 * 8, MAX_CHUNK_SIZE), MIN_CHUNK_SIZE)
         self.chunk_size = 1024
-        from kbx.common.token_counter.token_counter_factory import get_token_counter
-        from kbx.common.types import TokenCounterConfig
-        self.token_counter = get_token_counter(TokenCounterConfig(counter="estimated"))
+        self.token_counter = get_shared_token_counter(llm_model)
 
         # 设置环境变量和目录
         self._setup_directories()
 
+        # 大模型响应缓存，默认关闭
+        self.llm_cache = LLMCache(self.llm_cache_path) if enable_llm_cache else None
+
     def _setup_directories(self):
         """设置必要的目录路径"""
         self.tender_data_dir = os.environ.get('TENDER_DATA_DIR', os.path.join(
@@ -88,6 +151,8 @@ class BaseProcessor:
             self.root_dir, './data/extracted_results'))  # 提取结果目录
         self.extra_doc_elements_dir = os.environ.get('EXTRA_DOC_ELEMENTS_DIR', os.path.join(
             self.root_dir, './data/extra_doc_elements'))  # 额外文档元素目录
+        self.llm_cache_path = os.environ.get('LLM_CACHE_PATH', os.path.join(
+            self.root_dir, './data/llm_cache/llm_cache.db'))  # 大模型响应缓存文件
 
         # 确保目录存在
         for directory in [self.tender_data_dir, self.md_data_dir, self.output_dir, self.extra_doc_elements_dir]:
@@ -105,24 +170,23 @@ class BaseProcessor:
             self.ai_models_yaml_file = os.path.join(
                 self.root_dir, './config/ai_models.yaml')
 
-        # 初始化KBX
-        if self.kbx_yaml_file:
-            KBX.init(config=self.kbx_yaml_file)
-        if self.ai_models_yaml_file:
-            KBX.register_ai_models_from_conf(
-                model_configs=self.ai_models_yaml_file, overwrite=True)
+        # 初始化KBX，同一进程内相同配置只执行一次
+        ensure_kbx_initialized(self.kbx_yaml_file, self.ai_models_yaml_file)
 
     def create_knowledge_base(self,
                               config_file_path: str = 'config/create_vector_kb.yaml',
                               doc_path: str = None,
-                              chunk_size: int = None
+                              chunk_size: int = None,
+                              mode: str = 'rebuild'
                               ) -> None:
         """创建知识库
 
         Args:
             config_file_path: 配置文件路径
-            doc_path: 文档路径
+            doc_path: 文档路径；upsert模式下也可以是目录，目录中的所有文件作为知识库的文档集合
             chunk_size: 文档分块大小，默认为None
+            mode: rebuild表示删除同名知识库后重建；upsert表示保留知识库，按内容哈希只插入
+                新增或变化的文档，并删除已不存在的文档
         """
         kb_start_time = time.time()
 
@@ -152,6 +216,14 @@ class BaseProcessor:
             kb_config.vector_keyword_config.splitter_config.chunk_size = self.chunk_size
 
         print(f'创建知识库时chunk_size: {kb_config.vector_keyword_config.splitter_config.chunk_size}')
+        if mode == 'upsert':
+            self._upsert_knowledge_base(kb_config, doc_path)
+            kb_time = time.time() - kb_start_time
+            logger.info(f"Knowledge base upsert took {kb_time:.2f} seconds")
+            return
+        if mode != 'rebuild':
+            raise ValueError(f"Invalid mode \"{mode}\". Please use \"rebuild\" or \"upsert\".")
+
         # 如果知识库已存在，先删除
         if self._kb:
             return
@@ -161,6 +233,10 @@ class BaseProcessor:
             previous_kb.remove_kb()
         except RuntimeError:
             pass
+        # 重建后的知识库与upsert清单不再对应，删除清单，下次upsert时按无清单处理
+        manifest_path = self._kb_manifest_path(kb_config.name)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
 
         # 创建新知识库
         self._kb = KBX.create_new_kb(kb_config, user_id=DEFAULT_USER_ID)
@@ -178,6 +254,107 @@ class BaseProcessor:
         kb_time = time.time() - kb_start_time
         logger.info(f"Knowledge base creation took {kb_time:.2f} seconds")
 
+    def _kb_manifest_path(self, kb_name: str) -> str:
+        """知识库文档清单路径，清单记录每个文档的内容哈希和doc_id"""
+        manifest_dir = os.environ.get('KB_MANIFEST_DIR', os.path.join(
+            self.root_dir, './data/kb_manifests'))
+        key = hashlib.sha256(kb_name.encode('utf-8')).hexdigest()
+        return os.path.join(manifest_dir, f'{key}.json')
+
+    @staticmethod
+    def _file_hash(file_path: str) -> str:
+        """计算文件内容的sha256"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _upsert_knowledge_base(self, kb_config: KBCreationConfig, doc_path: str):
+        """增量更新知识库
+
+        保留已有知识库，对比文档内容哈希与清单记录：未变化的文档跳过，变化的文档插入新版本成功后
+        再删除旧版本，新增的文档直接插入，清单中已不存在的文档从知识库中删除。
+        已有知识库但没有清单（如由rebuild模式创建）时，知识库中原有的文档无法对应到文件，
+        在插入全部文档后删除，避免重复。
+
+        Args:
+            kb_config: 知识库配置
+            doc_path: 文档文件或目录路径
+        """
+        if doc_path and os.path.isdir(doc_path):
+            file_list = sorted(
+                os.path.abspath(os.path.join(doc_path, name)) for name in os.listdir(doc_path)
+                if os.path.isfile(os.path.join(doc_path, name)))
+        elif doc_path and os.path.isfile(doc_path):
+            file_list = [os.path.abspath(doc_path)]
+        else:
+            raise ValueError(f"doc_path must be an existing file or directory: {doc_path}")
+
+        if self._kb is None:
+            try:
+                self._kb = KBX.get_existed_kb(
+                    kb_name=kb_config.name, user_id=DEFAULT_USER_ID)
+                logger.info(f'Reuse existing kb {kb_config.name} (id={self._kb.kb_id})')
+            except RuntimeError:
+                self._kb = KBX.create_new_kb(kb_config, user_id=DEFAULT_USER_ID)
+                logger.info(f'Created new kb {kb_config.name} (id={self._kb.kb_id})')
+
+        manifest_path = self._kb_manifest_path(kb_config.name)
+        manifest = {}
+        manifest_exists = os.path.exists(manifest_path)
+        if manifest_exists:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        existing_doc_ids = set(self._kb.list_doc_ids()[0])
+        untracked_doc_ids = set() if manifest_exists else existing_doc_ids
+
+        file_hashes = {file_path: self._file_hash(file_path) for file_path in file_list}
+        replaced_doc_ids = {}
+        to_insert = []
+        for file_path, file_hash in file_hashes.items():
+            entry = manifest.get(file_path)
+            if entry and entry['hash'] == file_hash and entry['doc_id'] in existing_doc_ids:
+                continue
+            if entry and entry['doc_id'] in existing_doc_ids:
+                replaced_doc_ids[file_path] = entry['doc_id']
+            to_insert.append(file_path)
+        removed_files = [path for path in manifest if path not in file_hashes]
+
+        # 先插入新版本，只删除已成功替换的旧文档，插入失败的文档保留旧版本；
+        # 无论是否出错都记录已成功插入的文档，避免下次重复插入
+        failed_results = []
+        stale_doc_ids = []
+        try:
+            if to_insert:
+                results = self._kb.insert_docs(file_list=to_insert)
+                for file_path, doc_info in zip(to_insert, results):
+                    if doc_info.err_info.code != KBXError.Code.SUCCESS:
+                        failed_results.append(doc_info)
+                        continue
+                    manifest[file_path] = {'hash': file_hashes[file_path], 'doc_id': doc_info.doc_id}
+                    if file_path in replaced_doc_ids:
+                        stale_doc_ids.append(replaced_doc_ids[file_path])
+            stale_doc_ids.extend(manifest[path]['doc_id'] for path in removed_files
+                                 if manifest[path]['doc_id'] in existing_doc_ids)
+            stale_doc_ids.extend(sorted(untracked_doc_ids))
+            if stale_doc_ids:
+                self._kb.remove_docs(doc_ids=stale_doc_ids)
+            for path in removed_files:
+                manifest.pop(path)
+        finally:
+            os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+            tmp_path = f'{manifest_path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, manifest_path)
+
+        if failed_results:
+            raise RuntimeError(
+                f"Failed to insert docs to knowledge base:\n{failed_results}")
+        logger.info(f"Upserted kb {kb_config.name}: {len(to_insert)} inserted, "
+                    f"{len(stale_doc_ids)} removed, {len(file_list) - len(to_insert)} unchanged")
+
     def parse_and_split(self, docx_path: str, chunk_size: int = None):
         """解析和分割文档"""
         doc_parse_config = DocParseConfig()
@@ -227,16 +404,31 @@ class BaseProcessor:
 
         return doc_content_str
 
-    def call_llm(self, system_prompt: str, user_input: str, stream: bool = False) -> str:
+    def _get_cached_response(self, system_prompt: str, user_input: str, use_cache: bool):
+        """查询大模型响应缓存，返回(缓存键, 缓存内容)"""
+        if self.llm_cache is None or not use_cache:
+            return None, None
+        cache_key = LLMCache.make_key(self._llm_model, system_prompt, user_input)
+        return cache_key, self.llm_cache.get(cache_key)
+
+    def call_llm(self, system_prompt: str, user_input: str, stream: bool = False,
+                 use_cache: bool = True) -> str:
         """调用大模型
 
         Args:
             system_prompt: 系统提示词
             user_input: 用户输入
+            stream: 是否流式返回，流式调用不使用缓存
+            use_cache: 启用缓存时，是否读写缓存；为False时绕过缓存
 
         Returns:
             str: 模型响应
         """
+        cache_key, cached = self._get_cached_response(system_prompt, user_input, use_cache and not stream)
+        if cached is not None:
+            logger.info("LLM call served from cache")
+            return cached
+
         llm_start_time = time.time()
 
         response = self._client.chat(
@@ -251,6 +443,9 @@ class BaseProcessor:
         llm_time = time.time() - llm_start_time
         logger.info(f"LLM call took {llm_time:.2f} seconds")
 
+        if cache_key is not None and response is not None:
+            self.llm_cache.set(cache_key, response)
+
         return response
     
     def test_speed_of_llm(self, system_prompt: str, text_from_chunk: str) -> Dict[str, float]:
@@ -281,8 +476,8 @@ class BaseProcessor:
         response = self.call_llm(system_prompt, text_from_chunk, stream=True)
         
         i = 0
-        total_tokens = 0
         token_timestamps = []
+        generated_chunks = []
         first_token_received = False
         generated_text = ""
         first_token_time = None
@@ -290,8 +485,6 @@ class BaseProcessor:
         for res in response:
             content = res.choices[0].delta.content
             if content:
-                num_token = self.token_counter(content)
-                total_tokens += num_token
                 if not first_token_received:
                     first_token_time = time.time()
                     first_token_received = True
@@ -299,7 +492,10 @@ class BaseProcessor:
                 i += 1
                 token_timestamps.append(time.time())
                 generated_text += content
+                generated_chunks.append(content)
                 
+        # 生成结束后一次性批量统计token数，不在接收流式输出时逐段计数
+        total_tokens = sum(self.token_counter.count_batch(generated_chunks))
         metrics = {}
         if first_token_time is not None and len(token_timestamps) > 0:
             # 首 Token 延迟（请求开始到第一个 Token）
@@ -329,16 +525,22 @@ class BaseProcessor:
 
         return metrics
 
-    async def call_llm_async(self, system_prompt: str, user_input: str) -> str:
+    async def call_llm_async(self, system_prompt: str, user_input: str, use_cache: bool = True) -> str:
         """异步调用大模型接口
 
         Args:
             system_prompt: 系统提示词
             user_input: 用户输入
+            use_cache: 启用缓存时，是否读写缓存；为False时绕过缓存
 
         Returns:
             大模型的响应文本
         """
+        cache_key, cached = self._get_cached_response(system_prompt, user_input, use_cache)
+        if cached is not None:
+            logger.info("大模型调用命中缓存")
+            return cached
+
         start_time = time.time()
         try:
             response = await self._client.chat_async(
@@ -350,28 +552,73 @@ class BaseProcessor:
             )
             end_time = time.time()
             logger.info(f"大模型调用耗时: {end_time - start_time:.2f}秒")
-            return response
+            content = response.choices[0].message.content
+            if cache_key is not None and content is not None:
+                self.llm_cache.set(cache_key, content)
+            return content
         except Exception as e:
             logger.error(f"调用大模型失败: {e}")
             raise
 
-    def get_all_chunks(self) -> List[Chunk]:
+    def iter_chunks(self, page_size: int = 200, max_workers: int = 4) -> Iterator[Chunk]:
+        """分页并发地遍历知识库中的文档块
+
+        最多同时预取max_workers个文档的分页，每个文档在产出当前页之前先提交下一页的请求；
+        按文档顺序逐块产出，内存中只保留正在预取的分页。
+
+        Args:
+            page_size: 每次list_chunks请求的分页大小
+            max_workers: 并发预取的文档数
+
+        Yields:
+            Chunk: 文档块
+        """
+        doc_ids, _ = self._kb.list_doc_ids()  # 该接口在新版KBX中，返回值变为Tuple
+        logger.info(f"Found {len(doc_ids)} documents in knowledge base")
+
+        def fetch_page(doc_id: str, offset: int):
+            return self._kb.list_chunks(doc_id, offset=offset, limit=page_size)
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            doc_iter = iter(doc_ids)
+            pending = deque()
+
+            def submit_next_doc():
+                doc_id = next(doc_iter, None)
+                if doc_id is not None:
+                    pending.append((doc_id, executor.submit(fetch_page, doc_id, 0)))
+
+            for _ in range(max(1, max_workers)):
+                submit_next_doc()
+
+            while pending:
+                doc_id, future = pending.popleft()
+                offset = 0
+                while future is not None:
+                    chunks, total_count = future.result()
+                    offset += page_size
+                    has_more = len(chunks) >= page_size and (total_count is None or offset < total_count)
+                    # 先预取下一页，再产出当前页
+                    future = executor.submit(fetch_page, doc_id, offset) if has_more else None
+                    if future is None:
+                        submit_next_doc()
+                    for chunk, error in chunks:
+                        if error.code == KBXError.Code.SUCCESS and chunk is not None:
+                            yield chunk
+
+    def get_all_chunks(self, page_size: int = 200, max_workers: int = 4) -> List[Chunk]:
         """获取知识库中的所有文档块
 
+        Args:
+            page_size: 每次list_chunks请求的分页大小
+            max_workers: 并发预取的文档数
+
         Returns:
             List[Chunk]: 文档块列表
         """
         chunks_start_time = time.time()
 
-        doc_ids, _ = self._kb.list_doc_ids()  # 该接口在新版KBX中，返回值变为Tuple
-        logger.info(f"Found {len(doc_ids)} documents in knowledge base")
-
-        all_chunks = []
-        for doc_id in doc_ids:
-            chunks, total_count = self._kb.list_chunks(doc_id, offset=0, limit=-1)
-            for chunk, error in chunks:
-                if error.code == KBXError.Code.SUCCESS and chunk is not None:
-                    all_chunks.append(chunk)
+        all_chunks = list(self.iter_chunks(page_size=page_size, max_workers=max_workers))
 
         chunks_time = time.time() - chunks_start_time
         logger.info(
@@ -418,11 +665,40 @@ class BaseProcessor:
         with open(md_path, 'w', encoding='utf-8') as f:
             f.write(md_content)
 
-    def split_doc_to_batches(self, doc_data: DocData) -> Iterator[List[Dict[str, str]]]:
+    def _get_element_records(self, doc_data: DocData) -> List[Tuple[str, str, str, int]]:
+        """渲染文档元素并统计token数
+
+        同一文档中重复出现的doc_element_id只渲染和计数一次；缓存只在本次调用内有效，
+        不会在处理器上长期持有文档内容。
+
+        Returns:
+            List[Tuple[str, str, str, int]]: 按文档顺序排列的(id, type, markdown文本, token数)
+        """
+        rendered: Dict[str, Tuple[str, str]] = {}
+        for doc_element in doc_data.doc_elements:
+            element_id = doc_element.doc_element_id
+            if element_id not in rendered:
+                rendered[element_id] = (doc_element.type.value, doc_element_to_markdown(
+                    doc_element=doc_element, mode='original'))
+
+        # 所有元素的token数一次性批量统计
+        token_counts = self.token_counter.count_batch([md_text for _, md_text in rendered.values()])
+        element_cache = {
+            element_id: (element_type, md_text, token_count)
+            for (element_id, (element_type, md_text)), token_count in zip(rendered.items(), token_counts)
+        }
+
+        return [(doc_element.doc_element_id,) + element_cache[doc_element.doc_element_id]
+                for doc_element in doc_data.doc_elements]
+
+    def split_doc_to_batches(self, doc_data: DocData, mode: str = 'greedy') -> Iterator[List[Dict[str, str]]]:
         """不建立知识库，将长文档分割成N个顺序的的batch doc elements，用于后续的遍历处理
 
         Args:
             doc_data (DocData): 需要分割的文档数据
+            mode: 分批方式。greedy按文档顺序累积元素直到达到chunk_size；bin_packing按token数
+                从大到小首次适应装箱，批次更接近chunk_size、数量更少，但批次之间不再保持文档顺序，
+                批次内的元素仍按文档顺序排列
 
         Returns:
             Iterator[List[Dict[str, str]]]: 返回一个包含Batch数据的迭代器，每个Batch都是一个列表，
@@ -433,16 +709,20 @@ class BaseProcessor:
                     "content": str
                 }
         """
-        # TODO：暂时使用一个简单的按顺序累积doc elements直到达到chunk size的实现，未来可以考虑进行优化
-
+        # 调用时立即渲染出不可变的(id, type, 文本, token数)快照，代替对doc_elements的深拷贝，
+        # 外部在收到返回值后修改doc_data.doc_elements不会影响后续的batch
+        records = self._get_element_records(doc_data)
+        if mode == 'greedy':
+            return self._greedy_batches(records)
+        if mode == 'bin_packing':
+            return self._bin_packing_batches(records)
+        raise ValueError(f"Invalid mode \"{mode}\". Please use \"greedy\" or \"bin_packing\".")
+
+    def _greedy_batches(self, records: List[Tuple[str, str, str, int]]) -> Iterator[List[Dict[str, str]]]:
+        """按文档顺序累积元素直到达到chunk_size"""
         chunk_list = []
         chunk_token_count = 0
-        # NOTE: 这里需要使用深拷贝，否则外部在收到返回值后立马修改doc_data.doc_elements
-        for doc_element in doc_data.doc_elements.model_copy(deep=True):
-            md_text = doc_element_to_markdown(
-                doc_element=doc_element, mode='original')
-            doc_element_token_count = self.token_counter(md_text)
-
+        for element_id, element_type, md_text, doc_element_token_count in records:
             if len(chunk_list) > 0 and chunk_token_count + doc_element_token_count > self.chunk_size:
                 # 如果当前chunk_list非空，且加上当前doc_element后超过chunk_size，则yield当前chunk_list
                 yield chunk_list
@@ -451,8 +731,8 @@ class BaseProcessor:
 
             chunk_list.append(
                 {
-                    'id': doc_element.doc_element_id,
-                    'type': doc_element.type.value,
+                    'id': element_id,
+                    'type': element_type,
                     'content': md_text
                 }
             )
@@ -460,3 +740,29 @@ class BaseProcessor:
 
         if chunk_list:
             yield chunk_list
+
+    def _bin_packing_batches(self, records: List[Tuple[str, str, str, int]]) -> Iterator[List[Dict[str, str]]]:
+        """按token数从大到小首次适应装箱，超过chunk_size的元素单独成批"""
+        bins: List[List[int]] = []
+        bin_tokens: List[int] = []
+        for index in sorted(range(len(records)), key=lambda i: records[i][3], reverse=True):
+            token_count = records[index][3]
+            for bin_index, used in enumerate(bin_tokens):
+                if used + token_count <= self.chunk_size:
+                    bins[bin_index].append(index)
+                    bin_tokens[bin_index] += token_count
+                    break
+            else:
+                bins.append([index])
+                bin_tokens.append(token_count)
+
+        # 批次按其首个元素在文档中的位置排序，批次内元素恢复文档顺序
+        for indices in sorted((sorted(b) for b in bins), key=lambda b: b[0]):
+            yield [
+                {
+                    'id': records[i][0],
+                    'type': records[i][1],
+                    'content': records[i][2]
+                }
+                for i in indices
+            ]
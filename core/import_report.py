@@ -0,0 +1,70 @@
+import os
+import sys
+import json
+import subprocess
+from typing import Dict, List, Any
+
+# 需要统计导入耗时的模块
+CORE_MODULES = [
+    'core.log_reader',
+    'core.log_templates',
+    'core.log_tagger',
+    'core.log_checkpoint',
+    'core.klog_parser',
+    'core.llm_cache',
+    'core.ssh_pool',
+    'core.base_processor',
+    'core.plans.dataset_log_analyzer',
+    'core.plans.qwen_log_analyzer',
+]
+
+# 只应在绘图或创建Agent时才加载的重量级依赖
+HEAVY_MODULES = ['matplotlib', 'seaborn', 'pandas', 'agno', 'qwen_agent']
+
+_PROBE = (
+    "import importlib, json, sys, time\n"
+    "start = time.perf_counter()\n"
+    "importlib.import_module(sys.argv[1])\n"
+    "elapsed = time.perf_counter() - start\n"
+    "print(json.dumps({'seconds': elapsed, 'module_count': len(sys.modules),\n"
+    "                  'heavy': [m for m in json.loads(sys.argv[2]) if m in sys.modules]}))\n"
+)
+
+
+def measure_import(module_name: str) -> Dict[str, Any]:
+    """在独立的解释器进程中导入模块，统计冷启动耗时和被加载的重量级依赖
+
+    Args:
+        module_name: 模块名
+
+    Returns:
+        Dict[str, Any]: 包含module、seconds、module_count、heavy和error
+    """
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, '-c', _PROBE, module_name, json.dumps(HEAVY_MODULES)],
+        cwd=project_root, capture_output=True, text=True)
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()
+        return {'module': module_name, 'seconds': None, 'module_count': None, 'heavy': [],
+                'error': error[-1] if error else f'退出码 {result.returncode}'}
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    report.update({'module': module_name, 'error': None})
+    return report
+
+
+def build_report(module_names: List[str] = None) -> List[Dict[str, Any]]:
+    """逐个统计模块的导入耗时"""
+    return [measure_import(module_name) for module_name in (module_names or CORE_MODULES)]
+
+
+if __name__ == "__main__":
+    # 导入耗时报告：python -m core.import_report [模块名 ...]
+    reports = build_report(sys.argv[1:])
+    print(f"{'模块':<36} {'耗时(ms)':>10} {'模块数':>8}  重量级依赖")
+    for report in reports:
+        if report['error']:
+            print(f"{report['module']:<36} {'失败':>10} {'-':>8}  {report['error']}")
+            continue
+        heavy = ', '.join(report['heavy']) or '-'
+        print(f"{report['module']:<36} {report['seconds'] * 1000:>10.1f} {report['module_count']:>8}  {heavy}")
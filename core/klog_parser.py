@@ -0,0 +1,178 @@
+import os
+import re
+import sys
+import mmap
+import time
+import calendar
+from array import array
+from datetime import datetime
+from typing import Dict, List, Any
+
+# klog/glog日志头：Lmmdd hh:mm:ss.uuuuuu threadid file:line] msg
+KLOG_LINE_PATTERN = re.compile(
+    rb'^([IWEF])(\d{4} \d\d:\d\d:\d\d)\.(\d{6})\s+(\d+) ([^:\]\s]+):(\d+)\] ?()[^\n]*',
+    re.MULTILINE)
+
+
+def _days_before_month(year: int) -> List[int]:
+    """返回每个月第一天距年初的天数，下标为月份，下标13为全年天数"""
+    days = [0, 0]
+    for month in range(1, 13):
+        days.append(days[-1] + calendar.monthrange(year, month)[1])
+    return days
+
+
+class KlogColumns:
+    """klog日志头的列式解析结果
+
+    每一列都是紧凑的array数组，可以零拷贝转换为NumPy数组或pandas DataFrame：
+        severity: 日志级别（I/W/E/F的ASCII码）
+        timestamp: 距year年初的微秒数
+        thread_id: 线程ID
+        source: 源文件编码，对应sources列表中的下标
+        source_line: 源文件行号
+        line_offset: 行起始字节偏移
+        message_offset: 消息正文起始字节偏移
+        message_end: 消息正文结束字节偏移（不含换行符）
+    """
+
+    def __init__(self, year: int):
+        self.year = year
+        self.severity = array('B')
+        self.timestamp = array('q')
+        self.thread_id = array('l')
+        self.source = array('l')
+        self.source_line = array('l')
+        self.line_offset = array('q')
+        self.message_offset = array('q')
+        self.message_end = array('q')
+        self.sources: List[str] = []
+        self._source_codes: Dict[bytes, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.severity)
+
+    def to_numpy(self) -> Dict[str, Any]:
+        """转换为NumPy数组字典，timestamp转换为datetime64[us]，severity转换为单字符字节串"""
+        import numpy as np
+
+        year_start = np.datetime64(f'{self.year:04d}-01-01', 'us')
+        return {
+            'severity': np.frombuffer(self.severity, dtype='S1'),
+            'timestamp': year_start + np.frombuffer(self.timestamp, dtype=np.int64).astype('timedelta64[us]'),
+            'thread_id': np.frombuffer(self.thread_id, dtype=self.thread_id.typecode),
+            'source': np.frombuffer(self.source, dtype=self.source.typecode),
+            'source_line': np.frombuffer(self.source_line, dtype=self.source_line.typecode),
+            'line_offset': np.frombuffer(self.line_offset, dtype=np.int64),
+            'message_offset': np.frombuffer(self.message_offset, dtype=np.int64),
+            'message_end': np.frombuffer(self.message_end, dtype=np.int64),
+        }
+
+    def to_dataframe(self):
+        """转换为pandas DataFrame，source列为分类类型"""
+        import pandas as pd
+
+        columns = self.to_numpy()
+        columns['severity'] = columns['severity'].astype(str)
+        columns['source'] = pd.Categorical.from_codes(columns['source'], categories=self.sources)
+        return pd.DataFrame(columns)
+
+
+def parse_klog_bytes(data, year: int = None, base_offset: int = 0) -> KlogColumns:
+    """解析字节缓冲区中的klog日志头
+
+    不符合klog格式的行（如多行堆栈、第三方输出）以及月、日、时、分、秒越界的行会被跳过。
+
+    Args:
+        data: bytes或mmap等支持正则匹配的缓冲区
+        year: 日志年份，klog时间戳不含年份，默认为当前年份
+        base_offset: 缓冲区在文件中的起始偏移，用于计算字节偏移列
+
+    Returns:
+        KlogColumns: 列式解析结果
+    """
+    year = year or datetime.now().year
+    columns = KlogColumns(year)
+    days_before_month = _days_before_month(year)
+    source_codes = columns._source_codes
+    # 同一秒内的日志很多，按"mmdd hh:mm:ss"缓存换算结果
+    second_cache: Dict[bytes, int] = {}
+
+    severity_append = columns.severity.append
+    timestamp_append = columns.timestamp.append
+    thread_id_append = columns.thread_id.append
+    source_append = columns.source.append
+    source_line_append = columns.source_line.append
+    line_offset_append = columns.line_offset.append
+    message_offset_append = columns.message_offset.append
+    message_end_append = columns.message_end.append
+
+    for match in KLOG_LINE_PATTERN.finditer(data):
+        severity, second_key, micro, thread_id, source, source_line, _ = match.groups()
+        seconds = second_cache.get(second_key)
+        if seconds is None:
+            month, day = int(second_key[0:2]), int(second_key[2:4])
+            hour, minute, second = int(second_key[5:7]), int(second_key[8:10]), int(second_key[11:13])
+            if (1 <= month <= 12 and 1 <= day <= days_before_month[month + 1] - days_before_month[month]
+                    and hour < 24 and minute < 60 and second < 60):
+                seconds = (days_before_month[month] + day - 1) * 86400 + hour * 3600 + minute * 60 + second
+            else:
+                seconds = -1
+            second_cache[second_key] = seconds
+        if seconds < 0:
+            continue
+
+        code = source_codes.get(source)
+        if code is None:
+            code = source_codes[source] = len(columns.sources)
+            columns.sources.append(source.decode('utf-8', errors='replace'))
+
+        severity_append(severity[0])
+        timestamp_append(seconds * 1000000 + int(micro))
+        thread_id_append(int(thread_id))
+        source_append(code)
+        source_line_append(int(source_line))
+        line_offset_append(base_offset + match.start())
+        message_offset_append(base_offset + match.start(7))
+        message_end_append(base_offset + match.end())
+
+    return columns
+
+
+def parse_klog_file(log_file_path: str, year: int = None) -> KlogColumns:
+    """通过内存映射解析klog日志文件
+
+    Args:
+        log_file_path: 日志文件路径
+        year: 日志年份，默认为当前年份
+
+    Returns:
+        KlogColumns: 列式解析结果
+    """
+    with open(log_file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return KlogColumns(year or datetime.now().year)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return parse_klog_bytes(mm, year=year)
+
+
+if __name__ == "__main__":
+    # 基准测试：python core/klog_parser.py [日志文件] [重复次数]
+    log_file_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'data', 'k8s-volcano-controller.log')
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    with open(log_file_path, 'rb') as f:
+        data = f.read()
+    if not data.endswith(b'\n'):
+        data += b'\n'
+    data = data * repeat
+
+    start_time = time.perf_counter()
+    columns = parse_klog_bytes(data)
+    parse_time = time.perf_counter() - start_time
+
+    total_lines = data.count(b'\n')
+    print(f"输入: {len(data) / 1024 / 1024:.1f} MB, {total_lines} 行, 其中klog行 {len(columns)}")
+    print(f"解析耗时: {parse_time:.3f} 秒")
+    print(f"吞吐量: {total_lines / parse_time:,.0f} 行/秒, {len(data) / 1024 / 1024 / parse_time:.1f} MB/秒")
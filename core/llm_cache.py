@@ -0,0 +1,105 @@
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Optional, Dict
+
+
+class LLMCache:
+    """基于SQLite的大模型响应缓存
+
+    以模型名称、系统提示词和用户输入的哈希作为键，支持过期时间（TTL）和
+    按最近访问时间的LRU淘汰，并统计命中/未命中次数。
+    """
+
+    def __init__(self, db_path: str, ttl: float = 7 * 24 * 3600, max_entries: int = 10000):
+        """初始化缓存
+
+        Args:
+            db_path: SQLite数据库文件路径
+            ttl: 缓存过期时间（秒），小于等于0表示永不过期
+            max_entries: 最大缓存条目数，超出时淘汰最久未访问的条目
+        """
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS llm_cache ('
+            'key TEXT PRIMARY KEY, '
+            'response TEXT NOT NULL, '
+            'created_at REAL NOT NULL, '
+            'accessed_at REAL NOT NULL)')
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed_at ON llm_cache (accessed_at)')
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model_name: str, system_prompt: str, user_input: str) -> str:
+        """计算缓存键"""
+        digest = hashlib.sha256()
+        for part in (model_name, system_prompt, user_input):
+            data = (part or '').encode('utf-8')
+            # 写入长度前缀，避免不同字段拼接后产生相同内容
+            digest.update(len(data).to_bytes(8, 'big'))
+            digest.update(data)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """读取缓存，未命中或已过期时返回None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT response, created_at FROM llm_cache WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            response, created_at = row
+            if self.ttl > 0 and now - created_at > self.ttl:
+                self._conn.execute('DELETE FROM llm_cache WHERE key = ?', (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute('UPDATE llm_cache SET accessed_at = ? WHERE key = ?', (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return response
+
+    def set(self, key: str, response: str):
+        """写入缓存，并在超出容量时淘汰最久未访问的条目"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO llm_cache (key, response, created_at, accessed_at) '
+                'VALUES (?, ?, ?, ?)', (key, response, now, now))
+            if self.max_entries > 0:
+                self._conn.execute(
+                    'DELETE FROM llm_cache WHERE key IN ('
+                    'SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                    (self.max_entries,))
+            self._conn.commit()
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._conn.execute('DELETE FROM llm_cache')
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """返回缓存统计信息"""
+        with self._lock:
+            size = self._conn.execute('SELECT COUNT(*) FROM llm_cache').fetchone()[0]
+        return {'hits': self.hits, 'misses': self.misses, 'size': size}
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
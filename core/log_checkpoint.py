@@ -0,0 +1,95 @@
+import os
+import json
+import time
+import hashlib
+from typing import Dict, Any, Optional
+
+from kbx.common.logging import logger
+
+from core.log_reader import FINGERPRINT_SIZE, file_fingerprint
+
+
+class LogCheckpointStore:
+    """日志增量分析检查点存储
+
+    每个日志文件按绝对路径保存一个JSON检查点，记录inode、已处理的字节偏移、
+    文件开头指纹以及累计的分析状态。读取时会校验inode、文件大小和指纹，
+    发现日志轮转或截断时丢弃旧检查点，从头开始分析。
+    """
+
+    def __init__(self, checkpoint_dir: str):
+        """初始化检查点存储
+
+        Args:
+            checkpoint_dir: 检查点文件目录
+        """
+        self.checkpoint_dir = checkpoint_dir
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    def _checkpoint_path(self, log_file_path: str) -> str:
+        key = hashlib.sha256(os.path.abspath(log_file_path).encode('utf-8')).hexdigest()
+        return os.path.join(self.checkpoint_dir, f'{key}.json')
+
+    def load(self, log_file_path: str) -> Optional[Dict[str, Any]]:
+        """读取仍然有效的检查点
+
+        Args:
+            log_file_path: 日志文件路径
+
+        Returns:
+            Optional[Dict[str, Any]]: 检查点内容；不存在或日志已轮转/截断时返回None
+        """
+        checkpoint_path = self._checkpoint_path(log_file_path)
+        if not os.path.exists(checkpoint_path):
+            return None
+        try:
+            with open(checkpoint_path, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"读取检查点失败，将重新分析: {e}")
+            return None
+
+        stat = os.stat(log_file_path)
+        if checkpoint.get('inode') != stat.st_ino or checkpoint.get('device') != stat.st_dev:
+            logger.info(f"检测到日志轮转（inode变化），将重新分析: {log_file_path}")
+            return None
+        if stat.st_size < checkpoint.get('offset', 0):
+            logger.info(f"检测到日志截断，将重新分析: {log_file_path}")
+            return None
+        fingerprint_size = checkpoint.get('fingerprint_size', 0)
+        if file_fingerprint(log_file_path, fingerprint_size) != checkpoint.get('fingerprint'):
+            logger.info(f"检测到日志内容被替换，将重新分析: {log_file_path}")
+            return None
+        return checkpoint
+
+    def save(self, log_file_path: str, offset: int, state: Dict[str, Any]):
+        """保存检查点
+
+        Args:
+            log_file_path: 日志文件路径
+            offset: 已处理到的字节偏移
+            state: 需要在下次分析时继续使用的累计状态
+        """
+        stat = os.stat(log_file_path)
+        fingerprint_size = min(FINGERPRINT_SIZE, offset)
+        checkpoint = {
+            'path': os.path.abspath(log_file_path),
+            'inode': stat.st_ino,
+            'device': stat.st_dev,
+            'offset': offset,
+            'fingerprint_size': fingerprint_size,
+            'fingerprint': file_fingerprint(log_file_path, fingerprint_size),
+            'updated_at': time.time(),
+            'state': state
+        }
+        checkpoint_path = self._checkpoint_path(log_file_path)
+        tmp_path = f'{checkpoint_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f, ensure_ascii=False)
+        os.replace(tmp_path, checkpoint_path)
+
+    def reset(self, log_file_path: str):
+        """删除检查点"""
+        checkpoint_path = self._checkpoint_path(log_file_path)
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
@@ -0,0 +1,343 @@
+import os
+import json
+import mmap
+import hashlib
+import itertools
+import threading
+from array import array
+from typing import Any, Callable, Iterable, Iterator, List, Tuple
+
+# 文件开头用于计算指纹的字节数
+FINGERPRINT_SIZE = 1024
+
+
+def file_fingerprint(log_file_path: str, size: int) -> str:
+    """计算文件开头size字节的哈希，用于识别inode复用或copytruncate后重新写入的文件"""
+    with open(log_file_path, 'rb') as f:
+        return hashlib.sha256(f.read(size)).hexdigest()
+
+
+class LogChunk:
+    """日志块，记录文本内容及其在文件中的字节范围"""
+    def __init__(self, text: str, start_offset: int, end_offset: int):
+        self.text = text
+        self.start_offset = start_offset
+        self.end_offset = end_offset
+
+
+def find_last_line_end(log_file_path: str, block_size: int = 64 * 1024) -> int:
+    """返回最后一个完整行的结束偏移，即最后一个换行符之后的位置
+
+    文件末尾尚未写完的半行不计入，用于增量分析时确定可安全处理的范围。
+    """
+    with open(log_file_path, 'rb') as f:
+        position = os.fstat(f.fileno()).st_size
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            index = f.read(read_size).rfind(b'\n')
+            if index != -1:
+                return position + index + 1
+    return 0
+
+
+def iter_lines_reverse(log_file_path: str, block_size: int = 64 * 1024) -> Iterator[str]:
+    """从文件末尾开始按块倒序读取，逐行倒序返回日志行（不含换行符）
+
+    只读取实际用到的尾部数据块，适合在大文件上查看最新日志。
+    """
+    with open(log_file_path, 'rb') as f:
+        position = os.fstat(f.fileno()).st_size
+        remainder = b''
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            lines = (f.read(read_size) + remainder).split(b'\n')
+            # 第一段可能是被块边界截断的半行，留到下一块拼接
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                yield line.rstrip(b'\r').decode('utf-8', errors='replace')
+        yield remainder.rstrip(b'\r').decode('utf-8', errors='replace')
+
+
+def read_tail_lines(log_file_path: str, count: int,
+                    predicate: Callable[[str], bool] = None,
+                    max_scan_lines: int = None) -> List[str]:
+    """读取文件末尾的若干行
+
+    Args:
+        log_file_path: 日志文件路径
+        count: 需要返回的行数
+        predicate: 行过滤函数，只返回满足条件的行
+        max_scan_lines: 最多倒序扫描的行数，默认不限制
+
+    Returns:
+        List[str]: 按文件顺序排列的日志行
+    """
+    lines = []
+    reverse_lines = iter_lines_reverse(log_file_path)
+    # 文件以换行符结尾时，最后一个空段不算作一行
+    first = next(reverse_lines, None)
+    if first:
+        reverse_lines = itertools.chain([first], reverse_lines)
+    for scanned, line in enumerate(reverse_lines):
+        if len(lines) >= count or (max_scan_lines is not None and scanned >= max_scan_lines):
+            break
+        if predicate is None or predicate(line):
+            lines.append(line)
+    lines.reverse()
+    return lines
+
+
+def iter_log_lines(log_file_path: str, start_offset: int = 0, end_offset: int = None) -> Iterator[tuple]:
+    """通过内存映射逐行读取日志文件
+
+    Args:
+        log_file_path: 日志文件路径
+        start_offset: 起始字节偏移
+        end_offset: 结束字节偏移（不含），默认为文件末尾
+
+    Returns:
+        Iterator[tuple]: (行起始偏移, 行结束偏移, 行文本) 的迭代器，行文本包含换行符
+    """
+    with open(log_file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if end_offset is not None:
+            size = min(size, end_offset)
+        if size <= start_offset:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = start_offset
+            while start < size:
+                end = mm.find(b'\n', start)
+                end = size if end == -1 else end + 1
+                yield start, end, mm[start:end].decode('utf-8', errors='replace')
+                start = end
+
+
+def iter_token_batches(items: Iterable[Any],
+                       token_counter: Callable[[str], int],
+                       chunk_size: int,
+                       text_of: Callable[[Any], str] = None,
+                       count_block_size: int = 512) -> Iterator[List[Any]]:
+    """按顺序累积元素，切分为token数不超过chunk_size的批次
+
+    单个元素超过chunk_size时单独成批。token_counter提供count_batch时（如TokenCountingService），
+    每count_block_size个元素批量计数一次，且不经过缓存。
+
+    Args:
+        items: 元素迭代器
+        token_counter: token计数函数
+        chunk_size: 每批的最大token数
+        text_of: 从元素中取出需要计数的文本，默认元素本身即为文本
+        count_block_size: 批量计数的元素数
+
+    Returns:
+        Iterator[List[Any]]: 批次迭代器
+    """
+    count_batch = getattr(token_counter, 'count_batch', None)
+    batch = []
+    token_count = 0
+    items = iter(items)
+    while True:
+        block = list(itertools.islice(items, count_block_size))
+        if not block:
+            break
+        texts = [text_of(item) for item in block] if text_of else block
+        if count_batch is not None:
+            block_tokens = count_batch(texts, use_cache=False)
+        else:
+            block_tokens = [token_counter(text) for text in texts]
+        for item, item_tokens in zip(block, block_tokens):
+            if batch and token_count + item_tokens > chunk_size:
+                yield batch
+                batch = []
+                token_count = 0
+            batch.append(item)
+            token_count += item_tokens
+    if batch:
+        yield batch
+
+
+def iter_log_chunks(log_file_path: str,
+                    token_counter: Callable[[str], int],
+                    chunk_size: int,
+                    start_offset: int = 0,
+                    end_offset: int = None) -> Iterator[LogChunk]:
+    """按行边界将日志文件切分为不超过chunk_size个token的日志块
+
+    文件通过mmap读取，每产生一个日志块立即yield，内存占用与文件大小无关。
+    单行超过chunk_size时单独成块，不在行内切分。
+
+    Args:
+        log_file_path: 日志文件路径
+        token_counter: token计数函数
+        chunk_size: 每个日志块的最大token数
+        start_offset: 起始字节偏移
+        end_offset: 结束字节偏移（不含），默认为文件末尾
+
+    Returns:
+        Iterator[LogChunk]: 日志块迭代器
+    """
+    lines = iter_log_lines(log_file_path, start_offset, end_offset)
+    for batch in iter_token_batches(lines, token_counter, chunk_size, text_of=lambda line: line[2]):
+        yield LogChunk(''.join(line for _, _, line in batch), batch[0][0], batch[-1][1])
+
+
+class LogLineIndex:
+    """日志文件的行偏移索引
+
+    记录每一行的起始字节偏移，并持久化到磁盘。文件追加写入时只为新增部分建立索引，
+    并只把新增偏移追加到索引文件；inode变化、文件变小或文件开头指纹不一致
+    （copytruncate后又重新写到原大小以上）时重建。通过索引可以按行号随机读取任意窗口，而不必加载整个文件。
+    """
+
+    def __init__(self, log_file_path: str, index_dir: str = None):
+        """初始化行偏移索引
+
+        Args:
+            log_file_path: 日志文件路径
+            index_dir: 索引文件目录，默认为环境变量LOG_INDEX_DIR或core/data/log_index
+        """
+        self.log_file_path = log_file_path
+        self.index_dir = index_dir or os.environ.get('LOG_INDEX_DIR', os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), 'data', 'log_index'))
+        key = hashlib.sha256(os.path.abspath(log_file_path).encode('utf-8')).hexdigest()
+        self._index_path = os.path.join(self.index_dir, f'{key}.idx')
+        self._meta_path = os.path.join(self.index_dir, f'{key}.json')
+        self.offsets = array('q')
+        self.indexed_size = 0
+        self._inode = None
+        self._saved_count = 0
+        self._fingerprint_size = 0
+        self._fingerprint = None
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    @property
+    def line_count(self) -> int:
+        """已索引的行数"""
+        return len(self.offsets)
+
+    def refresh(self) -> 'LogLineIndex':
+        """使索引与文件当前内容保持一致，可在多个线程间共享调用"""
+        with self._lock:
+            stat = os.stat(self.log_file_path)
+            if self._inode is None:
+                self._load()
+            if (self._inode != stat.st_ino or stat.st_size < self.indexed_size
+                    or file_fingerprint(self.log_file_path, self._fingerprint_size) != self._fingerprint):
+                # 日志轮转、截断或内容被替换，重建索引
+                self.offsets = array('q')
+                self.indexed_size = 0
+                self._inode = stat.st_ino
+                self._saved_count = 0
+                self._fingerprint_size = 0
+                self._fingerprint = file_fingerprint(self.log_file_path, 0)
+            if stat.st_size > self.indexed_size:
+                self._extend(stat.st_size)
+                if self._fingerprint_size < FINGERPRINT_SIZE:
+                    self._fingerprint_size = min(FINGERPRINT_SIZE, self.indexed_size)
+                    self._fingerprint = file_fingerprint(self.log_file_path, self._fingerprint_size)
+                self._save()
+        return self
+
+    def read_lines(self, start: int, count: int) -> List[str]:
+        """按行号读取一段连续的日志行
+
+        Args:
+            start: 起始行号（从0开始）
+            count: 行数
+
+        Returns:
+            List[str]: 日志行列表，不含换行符
+        """
+        return [line for _, line in self.iter_lines(start, start + count)]
+
+    def iter_lines(self, start: int = 0, end: int = None) -> Iterator[Tuple[int, str]]:
+        """按行号区间迭代日志行
+
+        Args:
+            start: 起始行号（含）
+            end: 结束行号（不含），默认为最后一行
+
+        Returns:
+            Iterator[Tuple[int, str]]: (行号, 行文本) 迭代器，行文本不含换行符
+        """
+        end = len(self.offsets) if end is None else min(end, len(self.offsets))
+        start = max(start, 0)
+        if start >= end:
+            return
+        with open(self.log_file_path, 'rb') as f:
+            f.seek(self.offsets[start])
+            for line_no in range(start, end):
+                line = f.readline()
+                if not line:
+                    return
+                yield line_no, line.rstrip(b'\r\n').decode('utf-8', errors='replace')
+
+    def _extend(self, size: int):
+        """为[indexed_size, size)范围内的新增内容建立索引"""
+        with open(self.log_file_path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                offsets = self.offsets
+                position = self.indexed_size
+                # 上次索引停在未写完的半行时，该行起点已经记录过
+                if position > 0 and mm[position - 1:position] != b'\n':
+                    position = mm.find(b'\n', position, size)
+                    position = size if position == -1 else position + 1
+                while position < size:
+                    offsets.append(position)
+                    position = mm.find(b'\n', position, size)
+                    position = size if position == -1 else position + 1
+        self.indexed_size = size
+
+    def _load(self):
+        """从磁盘读取索引"""
+        try:
+            with open(self._meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            line_count = meta['line_count']
+            offsets = array('q')
+            with open(self._index_path, 'rb') as f:
+                offsets.frombytes(f.read(line_count * offsets.itemsize))
+            if len(offsets) != line_count:
+                return
+            # 追加了偏移但元数据未更新（如进程中途退出）时，丢弃元数据之外的部分
+            if os.path.getsize(self._index_path) > line_count * offsets.itemsize:
+                os.truncate(self._index_path, line_count * offsets.itemsize)
+        except (OSError, ValueError, KeyError):
+            return
+        self.offsets = offsets
+        self.indexed_size = meta['indexed_size']
+        self._inode = meta['inode']
+        self._saved_count = line_count
+        self._fingerprint_size = meta.get('fingerprint_size', 0)
+        self._fingerprint = meta.get('fingerprint')
+
+    def _save(self):
+        """保存索引到磁盘
+
+        索引文件只追加上次保存之后新增的偏移，重建后才整体重写；元数据最后原子替换，
+        保证读取时line_count不会超过索引文件中已写入的偏移数。
+        """
+        os.makedirs(self.index_dir, exist_ok=True)
+        with open(self._index_path, 'ab' if self._saved_count else 'wb') as f:
+            self.offsets[self._saved_count:].tofile(f)
+        self._saved_count = len(self.offsets)
+        tmp_path = f'{self._meta_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'path': os.path.abspath(self.log_file_path),
+                'inode': self._inode,
+                'indexed_size': self.indexed_size,
+                'line_count': len(self.offsets),
+                'fingerprint_size': self._fingerprint_size,
+                'fingerprint': self._fingerprint
+            }, f)
+        os.replace(tmp_path, self._meta_path)
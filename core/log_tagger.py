@@ -0,0 +1,151 @@
+import re
+from typing import Dict, List, Any, Tuple
+
+from core.log_templates import KLOG_HEADER_PATTERN, LogTemplateMiner
+
+# 本地预打标使用的正则表，同时作为提示信息发送给大模型
+LOG_PATTERNS = {
+    'performance': r'(latency|throughput|gpu_usage|memory_usage)',
+    'error': r'(error|exception|failed|timeout)',
+    'request': r'(request|query|prompt|completion)',
+    'cost': r'(cost|token|price)',
+    'resource': r'(gpu|memory|cpu|disk)'
+}
+
+# 正则类别到报告标签类型的映射
+LOG_PATTERN_TYPES = {
+    'performance': '性能指标',
+    'error': '错误',
+    'request': '请求',
+    'cost': '成本',
+    'resource': '资源'
+}
+
+KLOG_SEVERITY_LEVELS = {'F': 'high', 'E': 'high', 'W': 'medium', 'I': 'low'}
+_SEVERITY_RANKS = {'low': 0, 'medium': 1, 'high': 2}
+
+
+class LogPreTagger:
+    """基于正则表的确定性日志预打标器
+
+    各类别的正则在初始化时分别编译并逐个独立匹配，匹配位置重叠的类别（如memory_usage同时
+    命中性能指标和资源）都会被识别。
+    只命中一个类别，或klog级别为E/F的行视为可以确定分类；其余行交给大模型处理。
+    """
+
+    def __init__(self, patterns: Dict[str, str] = None):
+        """初始化预打标器
+
+        Args:
+            patterns: 类别到正则的映射，默认为LOG_PATTERNS
+        """
+        self.patterns = patterns or LOG_PATTERNS
+        self._compiled_patterns = [
+            (name, re.compile(pattern, re.IGNORECASE)) for name, pattern in self.patterns.items()]
+
+    def classify_line(self, line: str) -> List[str]:
+        """返回一行日志命中的类别列表，按patterns中的顺序排列"""
+        return [name for name, pattern in self._compiled_patterns if pattern.search(line)]
+
+    def tag_lines(self, lines: List[str]) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """对日志行进行预打标
+
+        Args:
+            lines: 日志行列表
+
+        Returns:
+            Tuple[List[Dict[str, Any]], List[str]]: (本地标签列表, 无法确定分类的日志行)
+        """
+        tags = []
+        unclassified = []
+        for line in lines:
+            line = line.rstrip('\r\n')
+            if not line.strip():
+                continue
+
+            severity_code = None
+            timestamp = None
+            header = KLOG_HEADER_PATTERN.match(line)
+            if header:
+                severity_code, timestamp = header.group(1), header.group(2)
+
+            categories = self.classify_line(line)
+            if severity_code in ('E', 'F') and 'error' not in categories:
+                categories.append('error')
+            if len(categories) != 1 and severity_code not in ('E', 'F'):
+                unclassified.append(line)
+                continue
+
+            for category in categories:
+                tag = {
+                    'type': LOG_PATTERN_TYPES.get(category, category),
+                    'content': line,
+                    'source': 'pre_tagger'
+                }
+                if severity_code:
+                    tag['severity'] = KLOG_SEVERITY_LEVELS[severity_code]
+                if timestamp:
+                    tag['timestamp'] = timestamp
+                tags.append(tag)
+        return tags, unclassified
+
+
+class PreTagAggregator:
+    """按类别和日志模板聚合预打标结果
+
+    同一类别下的日志行用LogTemplateMiner归并为模板，每个模板只输出一个标签，记录出现次数、
+    首末时间戳、最高级别和少量原始日志样例；每个类别只保留出现次数最多的max_templates个模板，
+    使发送给大模型的标签数量与日志行数无关。
+    """
+
+    def __init__(self, max_templates: int = 50, max_samples: int = 3):
+        """初始化聚合器
+
+        Args:
+            max_templates: 每个类别最多输出的模板数
+            max_samples: 每个模板保留的原始日志样例数
+        """
+        self.max_templates = max_templates
+        self.max_samples = max_samples
+        self.tag_count = 0
+        self._miners: Dict[str, LogTemplateMiner] = {}
+        self._details: Dict[Tuple[str, int], Dict[str, Any]] = {}
+
+    def add(self, tags: List[Dict[str, Any]]):
+        """累加LogPreTagger.tag_lines产生的标签"""
+        for tag in tags:
+            tag_type = tag['type']
+            miner = self._miners.setdefault(tag_type, LogTemplateMiner(max_samples=self.max_samples))
+            template = miner.add_line(tag['content'])
+            if template is None:
+                continue
+            self.tag_count += 1
+            details = self._details.setdefault((tag_type, template.template_id),
+                                               {'samples': [], 'severity': None})
+            if len(details['samples']) < self.max_samples:
+                details['samples'].append(tag['content'])
+            severity = tag.get('severity')
+            if severity and _SEVERITY_RANKS[severity] > _SEVERITY_RANKS.get(details['severity'], -1):
+                details['severity'] = severity
+
+    def to_tags(self) -> List[Dict[str, Any]]:
+        """输出聚合后的标签，每个类别按出现次数从多到少排列"""
+        tags = []
+        for tag_type, miner in self._miners.items():
+            templates = sorted(miner.templates, key=lambda template: template.count, reverse=True)
+            for template in templates[:self.max_templates]:
+                details = self._details[(tag_type, template.template_id)]
+                tag = {
+                    'type': tag_type,
+                    'content': template.template,
+                    'source': 'pre_tagger',
+                    'count': template.count,
+                    'samples': details['samples']
+                }
+                if details['severity']:
+                    tag['severity'] = details['severity']
+                if template.first_timestamp:
+                    tag['first_timestamp'] = template.first_timestamp
+                    tag['last_timestamp'] = template.last_timestamp
+                tags.append(tag)
+        return tags
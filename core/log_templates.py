@@ -0,0 +1,141 @@
+import re
+import json
+from typing import Dict, List, Any, Optional, Iterator
+
+from core.log_reader import iter_log_lines
+
+# klog/glog日志头，例如：I0122 08:29:24.096530       1 flags.go:57] FLAG: --v="4"
+KLOG_HEADER_PATTERN = re.compile(
+    r'^([IWEF])(\d{4} \d{2}:\d{2}:\d{2}\.\d+)\s+(\d+)\s+([^\s\]]+)\]\s?(.*)$')
+
+WILDCARD = '<*>'
+_DIGIT_PATTERN = re.compile(r'\d')
+
+
+class LogTemplate:
+    """日志模板，记录模板内容、出现次数、首末时间戳和变量样例"""
+    def __init__(self, template_id: int, tokens: List[str], prefix: str):
+        self.template_id = template_id
+        self.tokens = tokens
+        self.prefix = prefix
+        self.count = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.samples = []
+
+    @property
+    def template(self) -> str:
+        """模板文本，变量位置以<*>表示"""
+        return ' '.join(filter(None, [self.prefix, ' '.join(self.tokens)]))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            'template_id': self.template_id,
+            'template': self.template,
+            'count': self.count,
+            'first_timestamp': self.first_timestamp,
+            'last_timestamp': self.last_timestamp,
+            'samples': self.samples
+        }
+
+    def to_text(self) -> str:
+        """渲染为一行文本，用于替代原始日志行发送给大模型"""
+        parts = [f'[次数={self.count}] {self.template}']
+        if self.first_timestamp:
+            parts.append(f'首次={self.first_timestamp} 末次={self.last_timestamp}')
+        if self.samples:
+            parts.append(f'样例变量={json.dumps(self.samples, ensure_ascii=False)}')
+        return ' | '.join(parts)
+
+
+class LogTemplateMiner:
+    """Drain风格的在线日志模板挖掘器
+
+    按日志头（级别、源文件:行号）与token数分组，组内按位置相似度把日志行
+    归并到已有模板，不一致的位置替换为<*>，从而把大量同类日志压缩为少量模板。
+    """
+
+    def __init__(self, similarity_threshold: float = 0.5, max_samples: int = 3):
+        """初始化模板挖掘器
+
+        Args:
+            similarity_threshold: 归入已有模板所需的最小相似度
+            max_samples: 每个模板保留的变量样例数
+        """
+        self.similarity_threshold = similarity_threshold
+        self.max_samples = max_samples
+        self._groups: Dict[tuple, List[LogTemplate]] = {}
+        self._templates: List[LogTemplate] = []
+
+    @property
+    def templates(self) -> List[LogTemplate]:
+        """按首次出现顺序排列的模板列表"""
+        return self._templates
+
+    def add_line(self, line: str) -> Optional[LogTemplate]:
+        """处理一行日志，返回其所属模板；空行返回None"""
+        line = line.rstrip('\r\n')
+        if not line.strip():
+            return None
+
+        timestamp = None
+        prefix = ''
+        message = line
+        match = KLOG_HEADER_PATTERN.match(line)
+        if match:
+            severity, timestamp, _, source, message = match.groups()
+            prefix = f'{severity} {source}]'
+
+        tokens = message.split()
+        first_token = tokens[0] if tokens and not _DIGIT_PATTERN.search(tokens[0]) else WILDCARD
+        group = self._groups.setdefault((prefix, len(tokens), first_token), [])
+
+        template = self._match(group, tokens)
+        if template is None:
+            template = LogTemplate(len(self._templates), list(tokens), prefix)
+            group.append(template)
+            self._templates.append(template)
+        else:
+            for i, token in enumerate(tokens):
+                if template.tokens[i] != token:
+                    template.tokens[i] = WILDCARD
+
+        template.count += 1
+        if timestamp:
+            if template.first_timestamp is None:
+                template.first_timestamp = timestamp
+            template.last_timestamp = timestamp
+        if len(template.samples) < self.max_samples:
+            variables = [token for i, token in enumerate(tokens) if template.tokens[i] == WILDCARD]
+            if variables and variables not in template.samples:
+                template.samples.append(variables)
+        return template
+
+    def add_file(self, log_file_path: str, start_offset: int = 0, end_offset: int = None) -> 'LogTemplateMiner':
+        """逐行读取日志文件并挖掘模板"""
+        for _, _, line in iter_log_lines(log_file_path, start_offset, end_offset):
+            self.add_line(line)
+        return self
+
+    def iter_texts(self) -> Iterator[str]:
+        """逐个渲染模板文本"""
+        for template in self._templates:
+            yield template.to_text()
+
+    def _match(self, group: List[LogTemplate], tokens: List[str]) -> Optional[LogTemplate]:
+        """在分组内查找相似度最高且达到阈值的模板"""
+        if not tokens:
+            return group[0] if group else None
+
+        best_template = None
+        best_similarity = -1.0
+        for template in group:
+            same = sum(1 for a, b in zip(template.tokens, tokens) if a == b or a == WILDCARD)
+            similarity = same / len(tokens)
+            if similarity > best_similarity:
+                best_template = template
+                best_similarity = similarity
+        if best_similarity >= self.similarity_threshold:
+            return best_template
+        return None
@@ -7,26 +7,31 @@ project_root = os.path.dirname(os.path.dirname(current_dir))
 sys.path.append(project_root)
 
 import json
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime
 import pytz
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterable, Iterator
 from concurrent.futures import ThreadPoolExecutor
 import re
 import time
+import asyncio
 import concurrent.futures
 
 from core.base_processor import BaseProcessor
+from core.log_reader import iter_log_chunks, iter_token_batches, find_last_line_end
+from core.log_checkpoint import LogCheckpointStore
+from core.log_templates import LogTemplateMiner
+from core.log_tagger import LogPreTagger, PreTagAggregator, LOG_PATTERNS
+from core.plotting import load_plotting
 
 class Document:
     """简单的文档类，用于存储文本内容"""
-    def __init__(self, text: str):
+    def __init__(self, text: str, text_format: str = 'raw'):
         self.text = text
+        self.text_format = text_format  # raw: 原始日志行, template: 日志模板
 
 from core.prompts.log_analysis import (
     LOG_ANALYSIS_PROMPT,
+    LOG_TEMPLATE_ANALYSIS_PROMPT,
     LOG_SUMMARY_PROMPT,
     ERROR_ANALYSIS_PROMPT,
     PERFORMANCE_ANALYSIS_PROMPT,
@@ -38,6 +43,9 @@ from kbx.common.logging import logger
 
 CHINA_TZ = pytz.timezone('Asia/Shanghai')
 
+# 增量分析时检查点中保留的最近标签数，仅用于跨批次去重
+INCREMENTAL_RECENT_TAGS = 500
+
 class AIModelLogAnalyzer(BaseProcessor):
     """
     AI大模型日志分析器
@@ -53,19 +61,35 @@ class AIModelLogAnalyzer(BaseProcessor):
     
     def __init__(self, kb_name: str = "AI模型日志知识库",
                  kb_description: str = "这是一个AI大模型日志分析知识库",
-                 llm_model: str = 'deepseek-v3'):
+                 llm_model: str = 'deepseek-v3',
+                 enable_llm_cache: bool = False):
         super().__init__(kb_name=kb_name,
                         kb_description=kb_description,
-                        llm_model=llm_model)
+                        llm_model=llm_model,
+                        enable_llm_cache=enable_llm_cache)
+        self.pre_tagger = LogPreTagger()
+        self.checkpoint_store = LogCheckpointStore(os.environ.get(
+            'CHECKPOINT_DIR', os.path.join(self.output_dir, 'checkpoints')))  # 增量分析检查点目录
         
-    def analyze_logs(self, log_file_path: str, max_workers: int = None, chunk_size: int = None) -> Dict[str, Any]:
+    def analyze_logs(self, log_file_path: str, max_workers: int = None, chunk_size: int = None,
+                     use_async: bool = False, max_concurrency: int = 64,
+                     use_templates: bool = False, use_pre_tagger: bool = False,
+                     incremental: bool = False, section_timeout: float = 120) -> Dict[str, Any]:
         """
         分析AI模型日志文件并生成分析报告
         
         Args:
             log_file_path: 日志文件路径
             max_workers: 最大工作线程数
-            chunk_size: 日志分块大小
+            chunk_size: 日志分块的最大token数，默认为self.chunk_size
+            use_async: 是否使用asyncio并发提取标签，替代线程池
+            max_concurrency: use_async为True时的最大并发请求数
+            use_templates: 是否先将日志归并为模板，再把模板而不是原始日志行发送给大模型
+            use_pre_tagger: 是否先用本地正则预打标，只把无法确定分类的日志行发送给大模型
+            incremental: 是否增量分析。开启后只处理上次检查点之后新增的完整日志行，
+                各部分只把新增标签连同上次的分析结果发送给大模型进行合并，没有新增标签的部分
+                直接沿用上次结果；日志轮转或截断时自动从头分析
+            section_timeout: 生成报告时每个部分的超时时间（秒）
             
         Returns:
             包含分析结果的字典
@@ -73,20 +97,57 @@ class AIModelLogAnalyzer(BaseProcessor):
         if not os.path.exists(log_file_path):
             raise FileNotFoundError(f"日志文件不存在：{log_file_path}")
             
-        # 读取文本文件内容
+        # 按行边界流式切分日志文件
         try:
-            with open(log_file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                
-            # 创建文档对象
-            doc = Document(text=content)
-            self.all_chunks = [doc]  # 将整个文件作为一个块处理
+            start_offset, end_offset, recent_tags, previous_report = 0, None, [], None
+            if incremental:
+                end_offset = find_last_line_end(log_file_path)
+                checkpoint = self.checkpoint_store.load(log_file_path)
+                if checkpoint:
+                    start_offset = checkpoint['offset']
+                    recent_tags = checkpoint['state'].get('recent_tags', [])
+                    previous_report = checkpoint['state'].get('report')
+                    if start_offset >= end_offset and checkpoint['state'].get('report'):
+                        logger.info(f"日志自上次分析后没有新增内容: {log_file_path}")
+                        return checkpoint['state']['report']
+                logger.info(f"增量分析字节范围: {start_offset} - {end_offset}")
+
+            if use_templates:
+                chunks = self._iter_template_chunks(log_file_path, chunk_size or self.chunk_size,
+                                                    start_offset, end_offset)
+            else:
+                chunks = iter_log_chunks(log_file_path,
+                                         token_counter=self.token_counter,
+                                         chunk_size=chunk_size or self.chunk_size,
+                                         start_offset=start_offset,
+                                         end_offset=end_offset)
+            pre_tag_aggregator = PreTagAggregator()
+            if use_pre_tagger:
+                chunks = self._pre_tag_chunks(chunks, pre_tag_aggregator, chunk_size or self.chunk_size)
             
             # 提取日志标签
-            log_tags = self._extract_log_tags(max_workers)
+            if use_async:
+                log_tags = asyncio.run(self._extract_log_tags_async(chunks, max_concurrency))
+            else:
+                log_tags = self._extract_log_tags(max_workers, chunks=chunks)
+            pre_tags = pre_tag_aggregator.to_tags()
+            if pre_tags:
+                logger.info(f"本地预打标得到 {pre_tag_aggregator.tag_count} 个标签，聚合为 {len(pre_tags)} 个模板")
+                log_tags = self._deduplicate_results(pre_tags + log_tags)
+            if recent_tags:
+                # 去掉与最近已分析标签重复的部分，只保留真正新增的标签
+                seen = {(tag.get('type'), tag.get('content')) for tag in recent_tags}
+                log_tags = [tag for tag in log_tags if (tag.get('type'), tag.get('content')) not in seen]
             
-            # 生成分析报告
-            report = self._generate_analysis_report(log_tags)
+            # 生成分析报告，增量分析时与上次的报告合并
+            report = self._generate_analysis_report(log_tags, section_timeout=section_timeout,
+                                                    previous_report=previous_report)
+            
+            if incremental:
+                # 检查点只保存报告和有限数量的最近标签，大小不随分析次数增长
+                recent_tags = (recent_tags + log_tags)[-INCREMENTAL_RECENT_TAGS:]
+                self.checkpoint_store.save(log_file_path, end_offset,
+                                           {'recent_tags': recent_tags, 'report': report})
             
             # 生成可视化图表
             self._generate_visualizations(report)
@@ -97,33 +158,52 @@ class AIModelLogAnalyzer(BaseProcessor):
             logger.error(f"读取或处理日志文件时出错: {e}")
             raise
         
-    def _extract_log_tags(self, max_workers: int = None) -> List[Dict[str, Any]]:
-        """从日志中提取标签"""
+    def _extract_log_tags(self, max_workers: int = None, chunks: Iterable[Any] = None) -> List[Dict[str, Any]]:
+        """从日志中提取标签
+
+        日志块边产生边提交到线程池，同时在途的块数不超过工作线程数的两倍，
+        避免一次性把整个文件读入内存。
+
+        Args:
+            max_workers: 最大工作线程数
+            chunks: 日志块迭代器，默认为self.all_chunks
+        """
         start_time = time.time()
+        if chunks is None:
+            chunks = getattr(self, 'all_chunks', [])
+        if max_workers is None:
+            max_workers = min(32, (os.cpu_count() or 1) + 4)
+        max_pending = max_workers * 2
         
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            chunk_futures = {executor.submit(self._process_log_chunk, chunk): i 
-                           for i, chunk in enumerate(self.all_chunks)}
-            
-            all_results = [None] * len(self.all_chunks)
-            completed = 0
-            total = len(chunk_futures)
-            
-            for future in concurrent.futures.as_completed(chunk_futures):
-                chunk_index = chunk_futures[future]
+        chunk_results = {}
+        completed = 0
+        
+        def collect(done_futures):
+            nonlocal completed
+            for future in done_futures:
+                chunk_index = pending.pop(future)
                 try:
-                    chunk_results = future.result()
-                    all_results[chunk_index] = chunk_results or []
-                    
-                    completed += 1
-                    if completed % 10 == 0 or completed == total:
-                        logger.info(f"进度: {completed}/{total} 块已处理 ({completed/total*100:.1f}%)")
-                        
+                    chunk_results[chunk_index] = future.result() or []
                 except Exception as e:
                     logger.error(f"处理日志块 {chunk_index} 时出错: {e}")
-                    all_results[chunk_index] = []
-                    
-        all_results = [result for results in all_results if results for result in results]
+                    chunk_results[chunk_index] = []
+                completed += 1
+                if completed % 10 == 0:
+                    logger.info(f"进度: {completed} 块已处理")
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = {}
+            for i, chunk in enumerate(chunks):
+                if len(pending) >= max_pending:
+                    done, _ = concurrent.futures.wait(
+                        pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    collect(done)
+                pending[executor.submit(self._process_log_chunk, chunk)] = i
+            
+            collect(list(concurrent.futures.as_completed(pending)))
+            
+        logger.info(f"进度: 共 {completed} 块已处理完成")
+        all_results = [result for i in sorted(chunk_results) for result in chunk_results[i]]
         unique_results = self._deduplicate_results(all_results)
         
         total_time = time.time() - start_time
@@ -137,7 +217,10 @@ class AIModelLogAnalyzer(BaseProcessor):
             if isinstance(response, str):
                 return response
             elif hasattr(response, 'choices') and len(response.choices) > 0:
-                return response.choices[0].text
+                choice = response.choices[0]
+                if getattr(choice, 'message', None) is not None:
+                    return choice.message.content
+                return choice.text
             else:
                 logger.error(f"无法处理的LLM响应类型: {type(response)}")
                 return "{}"
@@ -145,59 +228,193 @@ class AIModelLogAnalyzer(BaseProcessor):
             logger.error(f"处理LLM响应时出错: {e}")
             return "{}"
 
+    def _iter_template_chunks(self, log_file_path: str, chunk_size: int,
+                              start_offset: int = 0, end_offset: int = None) -> Iterator[Document]:
+        """挖掘日志模板，并将模板文本按token数切分为日志块"""
+        start_time = time.time()
+        miner = LogTemplateMiner().add_file(log_file_path, start_offset, end_offset)
+        logger.info(f"日志模板挖掘完成，共 {len(miner.templates)} 个模板，耗时: {time.time() - start_time:.2f}秒")
+
+        for lines in iter_token_batches(miner.iter_texts(), self.token_counter, chunk_size):
+            yield Document(text='\n'.join(lines), text_format='template')
+
+    def _pre_tag_chunks(self, chunks: Iterable[Any], pre_tag_aggregator: PreTagAggregator,
+                        chunk_size: int) -> Iterator[Document]:
+        """对日志块进行本地预打标
+
+        可以确定分类的日志行按类别和模板聚合到pre_tag_aggregator中，其余行跨块重新累积为不超过chunk_size个token
+        的日志块交给大模型，使LLM调用次数随未分类行的数量而不是原始块数减少。
+        """
+        text_format = ['raw']
+
+        def iter_unclassified() -> Iterator[str]:
+            for chunk in chunks:
+                text_format[0] = getattr(chunk, 'text_format', 'raw')
+                tags, unclassified = self.pre_tagger.tag_lines(chunk.text.split('\n'))
+                pre_tag_aggregator.add(tags)
+                yield from unclassified
+
+        for lines in iter_token_batches(iter_unclassified(), self.token_counter, chunk_size):
+            yield Document(text='\n'.join(lines), text_format=text_format[0])
+
+    def _get_chunk_prompt(self, chunk: Any) -> str:
+        """根据日志块的文本格式选择标签提取提示词"""
+        if getattr(chunk, 'text_format', 'raw') == 'template':
+            return LOG_TEMPLATE_ANALYSIS_PROMPT
+        return LOG_ANALYSIS_PROMPT
+
+    def _build_chunk_input(self, chunk: Any) -> str:
+        """构建日志块的标签提取输入"""
+        return json.dumps({
+            'text': chunk.text,
+            'log_patterns': LOG_PATTERNS
+        }, ensure_ascii=False)
+
+    def _parse_chunk_response(self, response: Any) -> List[Dict[str, Any]]:
+        """解析日志块的标签提取结果"""
+        cleaned_response = self._clean_json_string(self._process_llm_response(response))
+        try:
+            results = json.loads(cleaned_response)
+            return results if isinstance(results, list) else []
+        except json.JSONDecodeError:
+            logger.error(f"无法解析LLM响应为JSON: {cleaned_response}")
+            return []
+
     def _process_log_chunk(self, chunk: Any) -> List[Dict[str, Any]]:
         """处理单个日志块"""
         try:
-            # 准备数据
-            user_input = json.dumps({
-                'text': chunk.text,
-                'log_patterns': {
-                    'performance': r'(latency|throughput|gpu_usage|memory_usage)',
-                    'error': r'(error|exception|failed|timeout)',
-                    'request': r'(request|query|prompt|completion)',
-                    'cost': r'(cost|token|price)',
-                    'resource': r'(gpu|memory|cpu|disk)'
-                }
-            }, ensure_ascii=False)
-            
             # 调用LLM进行标签提取
             response = self.call_llm(
-                system_prompt=LOG_ANALYSIS_PROMPT,
-                user_input=user_input
+                system_prompt=self._get_chunk_prompt(chunk),
+                user_input=self._build_chunk_input(chunk)
             )
-            
-            # 处理响应
-            cleaned_response = self._clean_json_string(self._process_llm_response(response))
-            try:
-                results = json.loads(cleaned_response)
-                return results if isinstance(results, list) else []
-            except json.JSONDecodeError:
-                logger.error(f"无法解析LLM响应为JSON: {cleaned_response}")
-                return []
+            return self._parse_chunk_response(response)
             
         except Exception as e:
             logger.error(f"处理日志块失败: {e}")
             return []
+
+    async def _process_log_chunk_async(self, chunk: Any) -> List[Dict[str, Any]]:
+        """异步处理单个日志块"""
+        try:
+            response = await self.call_llm_async(
+                system_prompt=self._get_chunk_prompt(chunk),
+                user_input=self._build_chunk_input(chunk)
+            )
+            return self._parse_chunk_response(response)
+
+        except Exception as e:
+            logger.error(f"处理日志块失败: {e}")
+            return []
+
+    async def _extract_log_tags_async(self, chunks: Iterable[Any] = None,
+                                      max_concurrency: int = 64) -> List[Dict[str, Any]]:
+        """在单个事件循环上并发提取日志标签
+
+        所有请求通过call_llm_async发出，同时在途的请求数不超过max_concurrency，
+        日志块在有空闲名额时才会被读取，结果按日志块顺序重新组装。
+
+        Args:
+            chunks: 日志块迭代器，默认为self.all_chunks
+            max_concurrency: 最大并发请求数
+        """
+        start_time = time.time()
+        if chunks is None:
+            chunks = getattr(self, 'all_chunks', [])
+        semaphore = asyncio.Semaphore(max_concurrency)
+        completed = 0
+
+        async def run(chunk_index: int, chunk: Any) -> List[Dict[str, Any]]:
+            nonlocal completed
+            try:
+                return await self._process_log_chunk_async(chunk) or []
+            except Exception as e:
+                logger.error(f"处理日志块 {chunk_index} 时出错: {e}")
+                return []
+            finally:
+                semaphore.release()
+                completed += 1
+                if completed % 10 == 0:
+                    logger.info(f"进度: {completed} 块已处理")
+
+        tasks = []
+        for i, chunk in enumerate(chunks):
+            await semaphore.acquire()
+            tasks.append(asyncio.create_task(run(i, chunk)))
+        chunk_results = await asyncio.gather(*tasks)
+
+        logger.info(f"进度: 共 {completed} 块已处理完成")
+        all_results = [result for results in chunk_results for result in results]
+        unique_results = self._deduplicate_results(all_results)
+
+        total_time = time.time() - start_time
+        logger.info(f"日志标签提取总耗时: {total_time:.2f}秒")
+
+        return unique_results
             
-    def _generate_analysis_report(self, log_tags: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """生成日志分析报告"""
+    def _generate_analysis_report(self, log_tags: List[Dict[str, Any]],
+                                  section_timeout: float = 120,
+                                  previous_report: Dict[str, Any] = None) -> Dict[str, Any]:
+        """生成日志分析报告
+
+        各部分分析互不依赖，并发调用LLM生成；单个部分超时或失败时该部分沿用上次结果或为空，
+        错误信息记录在report['section_errors']中，其余部分照常返回。
+
+        Args:
+            log_tags: 日志标签列表，增量分析时只包含新增标签
+            section_timeout: 每个部分的超时时间（秒）
+            previous_report: 上次的分析报告。提供时各部分只把新增标签连同上次该部分的结果
+                发送给大模型合并，没有新增标签的部分直接沿用上次结果
+        """
+        previous_report = previous_report or {}
         # 按标签类型分组
         grouped_tags = self._group_tags_by_type(log_tags)
         
-        # 生成各部分分析报告
-        report = {
-            'summary': self._generate_summary(grouped_tags),
-            'performance_analysis': self._analyze_performance(grouped_tags.get('性能指标', [])),
-            'error_analysis': self._analyze_errors(grouped_tags.get('错误', [])),
-            'request_analysis': self._analyze_requests(grouped_tags.get('请求', [])),
-            'cost_analysis': self._analyze_costs(grouped_tags.get('成本', [])),
-            'resource_analysis': self._analyze_resources(grouped_tags.get('资源', []))
+        # 并发生成各部分分析报告
+        sections = {
+            'performance_analysis': (self._analyze_performance, grouped_tags.get('性能指标', [])),
+            'error_analysis': (self._analyze_errors, grouped_tags.get('错误', [])),
+            'request_analysis': (self._analyze_requests, grouped_tags.get('请求', [])),
+            'cost_analysis': (self._analyze_costs, grouped_tags.get('成本', [])),
+            'resource_analysis': (self._analyze_resources, grouped_tags.get('资源', []))
         }
+        report = {'summary': self._generate_summary(grouped_tags, previous_report.get('summary'))}
+        section_errors = {}
+        
+        futures = {}
+        executor = ThreadPoolExecutor(max_workers=len(sections))
+        try:
+            for name, (func, tags) in sections.items():
+                previous_section = previous_report.get(name)
+                if previous_section and not tags:
+                    report[name] = previous_section
+                else:
+                    futures[name] = executor.submit(func, tags, previous_section or None)
+            deadline = time.time() + section_timeout
+            for name, future in futures.items():
+                try:
+                    report[name] = future.result(timeout=max(0, deadline - time.time()))
+                except concurrent.futures.TimeoutError:
+                    logger.error(f"生成{name}超时（{section_timeout}秒）")
+                    section_errors[name] = 'timeout'
+                    # 合并失败时保留上次的结果
+                    report[name] = previous_report.get(name) or {}
+                except Exception as e:
+                    logger.error(f"生成{name}时出错: {e}")
+                    section_errors[name] = str(e)
+                    report[name] = previous_report.get(name) or {}
+        finally:
+            # 不等待超时的部分，避免拖慢整个报告
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        if section_errors:
+            report['section_errors'] = section_errors
         
         return report
         
     def _generate_visualizations(self, report: Dict[str, Any]) -> None:
         """生成可视化图表"""
+        plt, sns, pd = load_plotting()
         plt.style.use('seaborn')
         
         # 1. 性能指标趋势图
@@ -255,9 +472,10 @@ class AIModelLogAnalyzer(BaseProcessor):
                 plt.savefig('resource_usage.png')
                 plt.close()
                 
-    def _analyze_performance(self, perf_tags: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _analyze_performance(self, perf_tags: List[Dict[str, Any]],
+                             previous: Dict[str, Any] = None) -> Dict[str, Any]:
         """分析性能指标"""
-        perf_input = json.dumps(perf_tags, ensure_ascii=False)
+        perf_input = self._build_section_input(perf_tags, previous)
         response = self.call_llm(
             system_prompt=PERFORMANCE_ANALYSIS_PROMPT,
             user_input=perf_input
@@ -269,9 +487,10 @@ class AIModelLogAnalyzer(BaseProcessor):
             logger.error(f"解析性能分析结果时出错: {e}")
             return {}
         
-    def _analyze_errors(self, error_tags: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _analyze_errors(self, error_tags: List[Dict[str, Any]],
+                        previous: Dict[str, Any] = None) -> Dict[str, Any]:
         """分析错误日志"""
-        error_input = json.dumps(error_tags, ensure_ascii=False)
+        error_input = self._build_section_input(error_tags, previous)
         response = self.call_llm(
             system_prompt=ERROR_ANALYSIS_PROMPT,
             user_input=error_input
@@ -283,9 +502,10 @@ class AIModelLogAnalyzer(BaseProcessor):
             logger.error(f"解析错误分析结果时出错: {e}")
             return {}
         
-    def _analyze_requests(self, request_tags: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _analyze_requests(self, request_tags: List[Dict[str, Any]],
+                          previous: Dict[str, Any] = None) -> Dict[str, Any]:
         """分析请求模式"""
-        request_input = json.dumps(request_tags, ensure_ascii=False)
+        request_input = self._build_section_input(request_tags, previous)
         response = self.call_llm(
             system_prompt=BUSINESS_ANALYSIS_PROMPT,
             user_input=request_input
@@ -297,9 +517,10 @@ class AIModelLogAnalyzer(BaseProcessor):
             logger.error(f"解析请求分析结果时出错: {e}")
             return {}
         
-    def _analyze_costs(self, cost_tags: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _analyze_costs(self, cost_tags: List[Dict[str, Any]],
+                       previous: Dict[str, Any] = None) -> Dict[str, Any]:
         """分析成本"""
-        cost_input = json.dumps(cost_tags, ensure_ascii=False)
+        cost_input = self._build_section_input(cost_tags, previous)
         response = self.call_llm(
             system_prompt=BUSINESS_ANALYSIS_PROMPT,
             user_input=cost_input
@@ -311,9 +532,10 @@ class AIModelLogAnalyzer(BaseProcessor):
             logger.error(f"解析成本分析结果时出错: {e}")
             return {}
         
-    def _analyze_resources(self, resource_tags: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _analyze_resources(self, resource_tags: List[Dict[str, Any]],
+                           previous: Dict[str, Any] = None) -> Dict[str, Any]:
         """分析资源使用"""
-        resource_input = json.dumps(resource_tags, ensure_ascii=False)
+        resource_input = self._build_section_input(resource_tags, previous)
         response = self.call_llm(
             system_prompt=SYSTEM_STATUS_PROMPT,
             user_input=resource_input
@@ -325,6 +547,16 @@ class AIModelLogAnalyzer(BaseProcessor):
             logger.error(f"解析资源分析结果时出错: {e}")
             return {}
         
+    def _build_section_input(self, tags: List[Dict[str, Any]], previous: Dict[str, Any] = None) -> str:
+        """构建报告部分的输入；有上次结果时要求大模型在其基础上合并新增日志"""
+        if not previous:
+            return json.dumps(tags, ensure_ascii=False)
+        return json.dumps({
+            'instruction': '以下是上次的分析结果和之后新增的日志标签，请在上次结果的基础上合并新增内容，输出完整的最新分析结果',
+            'previous_analysis': previous,
+            'new_logs': tags
+        }, ensure_ascii=False)
+        
     def _clean_json_string(self, json_str: str) -> str:
         """清理JSON字符串"""
         json_str = json_str.strip()
@@ -364,26 +596,30 @@ class AIModelLogAnalyzer(BaseProcessor):
                 
         return unique_results
 
-    def _generate_summary(self, grouped_tags: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
-        """生成日志分析摘要"""
+    def _generate_summary(self, grouped_tags: Dict[str, List[Dict[str, Any]]],
+                          previous_summary: Dict[str, Any] = None) -> Dict[str, Any]:
+        """生成日志分析摘要，提供上次的摘要时累加各类标签计数"""
+        tag_counts = dict((previous_summary or {}).get('tag_counts', {}))
+        for tag_type, tags in grouped_tags.items():
+            tag_counts[tag_type] = tag_counts.get(tag_type, 0) + sum(tag.get('count', 1) for tag in tags)
         summary = {
-            'total_tags': sum(len(tags) for tags in grouped_tags.values()),
-            'tag_types': list(grouped_tags.keys()),
-            'tag_counts': {tag_type: len(tags) for tag_type, tags in grouped_tags.items()},
+            'total_tags': sum(tag_counts.values()),
+            'tag_types': list(tag_counts.keys()),
+            'tag_counts': tag_counts,
             'timestamp': datetime.now(CHINA_TZ).strftime('%Y-%m-%d %H:%M:%S')
         }
         
         # 添加关键指标
-        if '性能指标' in grouped_tags:
-            summary['performance_metrics'] = len(grouped_tags['性能指标'])
-        if '错误' in grouped_tags:
-            summary['error_count'] = len(grouped_tags['错误'])
-        if '请求' in grouped_tags:
-            summary['request_count'] = len(grouped_tags['请求'])
-        if '成本' in grouped_tags:
-            summary['cost_metrics'] = len(grouped_tags['成本'])
-        if '资源' in grouped_tags:
-            summary['resource_metrics'] = len(grouped_tags['资源'])
+        if '性能指标' in tag_counts:
+            summary['performance_metrics'] = tag_counts['性能指标']
+        if '错误' in tag_counts:
+            summary['error_count'] = tag_counts['错误']
+        if '请求' in tag_counts:
+            summary['request_count'] = tag_counts['请求']
+        if '成本' in tag_counts:
+            summary['cost_metrics'] = tag_counts['成本']
+        if '资源' in tag_counts:
+            summary['resource_metrics'] = tag_counts['资源']
             
         return summary
 
@@ -1,21 +1,35 @@
+import sys
 import os
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.append(project_root)
+
+import re
 import json
-from typing import Dict, List, Any
+import time
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Any, Tuple, Iterator
 from datetime import datetime
 import pytz
 import dashscope
-import matplotlib.pyplot as plt
-import seaborn as sns
-import pandas as pd
-from qwen_agent.agents import Assistant
-from qwen_agent.tools.base import BaseTool, register_tool
-from qwen_agent.utils.output_beautify import typewriter_print
+
+from core.log_reader import LogLineIndex
+from core.log_templates import KLOG_HEADER_PATTERN
+from core.plotting import load_plotting
+
+if TYPE_CHECKING:
+    from qwen_agent.agents import Assistant
 
 CHINA_TZ = pytz.timezone('Asia/Shanghai')
 
-# 设置中文字体
-plt.rcParams['font.sans-serif'] = ['SimHei']
-plt.rcParams['axes.unicode_minus'] = False
+# log_analyzer工具单次返回的默认行数、最大行数，以及单次调用最多扫描的行数
+DEFAULT_WINDOW_LINES = 200
+MAX_WINDOW_LINES = 1000
+MAX_SCAN_LINES = 100000
 
 def configure_api_key(api_key: str = None):
     """配置API Key"""
@@ -32,8 +46,97 @@ def configure_api_key(api_key: str = None):
             "4. 设置API Key文件路径环境变量：export DASHSCOPE_API_KEY_FILE_PATH='path/to/api_key_file'"
         )
 
+# 结构化分析结果中的顶层字段及其对应的流式阶段名称
+ANALYSIS_SECTION_STEPS = {
+    'performance_metrics': '性能指标',
+    'error_distribution': '错误分析',
+    'request_patterns': '请求模式',
+    'resource_usage': '资源使用',
+    'cost_analysis': '成本分析'
+}
+
+class IncrementalJSONParser:
+    """增量JSON解析器
+
+    逐段喂入LLM流式输出的新增文本，每个字符只扫描一次。忽略顶层对象之前的
+    说明文字或```json标记，只有位于行首（可有前导空白）的{才视为顶层对象的开始，
+    顶层对象中的每个字段在其值完整结束时立即解析并返回。对象结束后同一段文本中
+    未消费的部分保存在remainder中，供调用方交给新的解析器继续解析。
+    """
+
+    def __init__(self):
+        self.started = False
+        self.done = False
+        self.remainder = ''
+        self._line_start = True
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member = []
+
+    def feed(self, delta: str) -> List[Tuple[str, Any]]:
+        """喂入新增文本
+
+        Args:
+            delta: 本次新增的文本
+
+        Returns:
+            List[Tuple[str, Any]]: 本次新完成的(字段名, 字段值)列表
+        """
+        completed = []
+        for i, c in enumerate(delta):
+            if self.done:
+                self.remainder = delta[i:]
+                break
+            if not self.started:
+                if c == '{' and self._line_start:
+                    self.started = True
+                    self._depth = 1
+                elif c == '\n':
+                    self._line_start = True
+                elif not c.isspace():
+                    self._line_start = False
+                continue
+            if self._in_string:
+                self._member.append(c)
+                if self._escape:
+                    self._escape = False
+                elif c == '\\':
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                continue
+
+            if c == '"':
+                self._in_string = True
+            elif c in '{[':
+                self._depth += 1
+            elif c in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    completed.extend(self._flush_member())
+                    self.done = True
+                    continue
+            elif c == ',' and self._depth == 1:
+                completed.extend(self._flush_member())
+                continue
+            self._member.append(c)
+        return completed
+
+    def _flush_member(self) -> List[Tuple[str, Any]]:
+        """解析当前收集到的顶层字段"""
+        member_text = ''.join(self._member).strip()
+        self._member = []
+        if not member_text:
+            return []
+        try:
+            return list(json.loads('{' + member_text + '}').items())
+        except json.JSONDecodeError:
+            return []
+
 def generate_visualizations(analysis_data: Dict[str, Any], output_dir: str = "analysis_results"):
     """生成可视化图表"""
+    plt, sns, pd = load_plotting()
     os.makedirs(output_dir, exist_ok=True)
     
     # 1. 性能指标趋势图
@@ -96,31 +199,107 @@ def generate_visualizations(analysis_data: Dict[str, Any], output_dir: str = "an
         plt.savefig(os.path.join(output_dir, 'cost_analysis.png'))
         plt.close()
 
-@register_tool('log_analyzer')
-class LogAnalyzerTool(BaseTool):
-    """日志分析工具，用于分析AI模型日志文件"""
-    description = '分析AI模型日志文件，提取性能指标、错误信息、请求模式等信息'
+class LogAnalyzerToolMixin:
+    """日志分析工具的实现，用于分析AI模型日志文件
+
+    基于磁盘上的行偏移索引按窗口读取日志，支持按行号、时间范围、日志级别和正则过滤，
+    每次只返回需要的片段，文件再大也不会撑爆模型上下文。
+    qwen_agent只在创建助手时才导入，由register_log_analyzer_tool与BaseTool组合并注册为log_analyzer工具。
+    """
+    description = ('按窗口读取AI模型日志文件，用于提取性能指标、错误信息、请求模式等信息。'
+                   '每次最多返回limit行，可通过next_offset继续翻页，'
+                   '并可按时间范围、日志级别和正则表达式过滤')
     parameters = [{
         'name': 'log_file',
         'type': 'string',
         'description': '日志文件路径',
         'required': True
+    }, {
+        'name': 'offset',
+        'type': 'integer',
+        'description': '起始行号，从0开始，默认为0；翻页时传入上次返回的next_offset',
+        'required': False
+    }, {
+        'name': 'limit',
+        'type': 'integer',
+        'description': f'最多返回的行数，默认为{DEFAULT_WINDOW_LINES}，最大为{MAX_WINDOW_LINES}',
+        'required': False
+    }, {
+        'name': 'start_time',
+        'type': 'string',
+        'description': '起始时间（含），klog格式"MMDD hh:mm:ss"，例如"0122 08:29:24"',
+        'required': False
+    }, {
+        'name': 'end_time',
+        'type': 'string',
+        'description': '结束时间（含），klog格式"MMDD hh:mm:ss"',
+        'required': False
+    }, {
+        'name': 'severity',
+        'type': 'string',
+        'description': '日志级别过滤，I/W/E/F中的一个或多个，例如"W,E"',
+        'required': False
+    }, {
+        'name': 'pattern',
+        'type': 'string',
+        'description': '对日志行进行过滤的正则表达式',
+        'required': False
     }]
 
+    _indexes: Dict[str, LogLineIndex] = {}
+    _indexes_lock = threading.Lock()
+
     def call(self, params: str, **kwargs) -> str:
         try:
-            log_file = json.loads(params)['log_file']
+            params = json.loads(params)
+            log_file = params['log_file']
             if not os.path.exists(log_file):
                 return json.dumps({
                     'error': f'日志文件不存在：{log_file}'
                 }, ensure_ascii=False)
 
-            with open(log_file, 'r', encoding='utf-8') as f:
-                content = f.read()
+            index = self._get_index(log_file)
+            offset = max(int(params.get('offset') or 0), 0)
+            limit = min(max(int(params.get('limit') or DEFAULT_WINDOW_LINES), 1), MAX_WINDOW_LINES)
+            start_time = params.get('start_time')
+            end_time = params.get('end_time')
+            severities = set(params['severity'].replace(',', ' ').upper().split()) if params.get('severity') else None
+            pattern = re.compile(params['pattern']) if params.get('pattern') else None
 
-            # 返回日志内容供LLM分析
+            # 只给出起始时间时，借助行索引二分定位到起始时间附近，跳过之前的内容
+            if start_time and 'offset' not in params:
+                offset = self._seek_time(index, start_time)
+
+            lines = []
+            next_offset = None
+            line_time, line_severity = None, None
+            scan_end = min(index.line_count, offset + MAX_SCAN_LINES)
+            for line_no, line in index.iter_lines(offset, scan_end):
+                header = KLOG_HEADER_PATTERN.match(line)
+                if header:
+                    line_severity, line_time = header.group(1), header.group(2)
+                # 没有日志头的行（如堆栈）沿用上一条日志的时间和级别
+                if end_time and line_time and line_time[:len(end_time)] > end_time:
+                    next_offset = None
+                    break
+                if start_time and (not line_time or line_time[:len(start_time)] < start_time):
+                    continue
+                if severities and line_severity not in severities:
+                    continue
+                if pattern and not pattern.search(line):
+                    continue
+                lines.append({'line_no': line_no, 'text': line})
+                if len(lines) >= limit:
+                    next_offset = line_no + 1 if line_no + 1 < index.line_count else None
+                    break
+            else:
+                next_offset = scan_end if scan_end < index.line_count else None
+
+            # 返回日志片段供LLM分析
             return json.dumps({
-                'content': content,
+                'lines': lines,
+                'total_lines': index.line_count,
+                'next_offset': next_offset,
                 'timestamp': datetime.now(CHINA_TZ).strftime('%Y-%m-%d %H:%M:%S')
             }, ensure_ascii=False)
         except Exception as e:
@@ -128,22 +307,57 @@ class LogAnalyzerTool(BaseTool):
                 'error': f'处理日志文件时出错：{str(e)}'
             }, ensure_ascii=False)
 
-def create_log_analyzer(api_key: str = None) -> Assistant:
-    """创建日志分析助手"""
-    # 配置API Key
-    configure_api_key(api_key)
-    
-    # 配置LLM
-    llm_cfg = {
-        'model': 'qwen2.5-72b-instruct',
-        'model_type': 'qwen_dashscope',
-        'generate_cfg': {
-            'top_p': 0.8
-        }
+    def _get_index(self, log_file: str) -> LogLineIndex:
+        """获取并刷新日志文件的行偏移索引"""
+        with self._indexes_lock:
+            index = self._indexes.get(log_file)
+            if index is None:
+                index = self._indexes[log_file] = LogLineIndex(log_file)
+            else:
+                index.refresh()
+            return index
+
+    def _seek_time(self, index: LogLineIndex, start_time: str) -> int:
+        """二分查找时间戳不早于start_time的第一条日志所在行附近的行号"""
+        low, high = 0, index.line_count
+        while low < high:
+            mid = (low + high) // 2
+            line_time = None
+            for _, line in index.iter_lines(mid, min(mid + 16, index.line_count)):
+                header = KLOG_HEADER_PATTERN.match(line)
+                if header:
+                    line_time = header.group(2)
+                    break
+            if line_time is not None and line_time[:len(start_time)] < start_time:
+                low = mid + 1
+            else:
+                high = mid
+        return max(low - 1, 0)
+
+@lru_cache(maxsize=None)
+def register_log_analyzer_tool() -> type:
+    """导入qwen_agent并注册log_analyzer工具，重复调用时返回已注册的工具类"""
+    from qwen_agent.tools.base import BaseTool, register_tool
+
+    return register_tool('log_analyzer')(type('LogAnalyzerTool', (LogAnalyzerToolMixin, BaseTool), {}))
+
+def __getattr__(name):
+    # 兼容直接引用LogAnalyzerTool的调用方，首次访问时才导入qwen_agent
+    if name == 'LogAnalyzerTool':
+        return register_log_analyzer_tool()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# 日志分析助手使用的LLM配置
+LOG_ANALYZER_LLM_CFG = {
+    'model': 'qwen2.5-72b-instruct',
+    'model_type': 'qwen_dashscope',
+    'generate_cfg': {
+        'top_p': 0.8
     }
+}
 
-    # 系统提示词
-    system_instruction = '''你是一个专业的AI模型日志分析助手。你的任务是：
+# 日志分析助手的系统提示词
+LOG_ANALYZER_SYSTEM_INSTRUCTION = '''你是一个专业的AI模型日志分析助手。你的任务是：
 1. 分析日志文件中的性能指标（延迟、吞吐量、资源使用等）
 2. 识别和分类错误和异常
 3. 分析请求模式和用户行为
@@ -159,34 +373,114 @@ def create_log_analyzer(api_key: str = None) -> Assistant:
 - resource_usage: 资源使用数据
 - cost_analysis: 成本分析数据'''
 
+def create_log_analyzer(api_key: str = None, llm_cfg: Dict[str, Any] = None) -> 'Assistant':
+    """创建日志分析助手"""
+    from qwen_agent.agents import Assistant
+
+    register_log_analyzer_tool()
+
+    # 配置API Key
+    configure_api_key(api_key)
+    
+    # 配置LLM，API Key写入助手自身的配置，避免不同会话之间互相覆盖
+    llm_cfg = dict(llm_cfg or LOG_ANALYZER_LLM_CFG)
+    llm_cfg['api_key'] = dashscope.api_key
+
     # 创建助手实例
     bot = Assistant(
         llm=llm_cfg,
-        system_message=system_instruction,
+        system_message=LOG_ANALYZER_SYSTEM_INSTRUCTION,
         function_list=['log_analyzer', 'code_interpreter']
     )
 
     return bot
 
+class AssistantPool:
+    """进程级日志分析助手池
+
+    按API Key和LLM配置缓存已创建的助手，避免每次分析都重新配置和构建。
+    助手在使用期间被独占借出，同一实例不会被多个Streamlit会话同时使用；
+    空闲超过idle_timeout秒的助手会被淘汰。
+    """
+
+    def __init__(self, idle_timeout: float = 600, max_idle_per_key: int = 4):
+        """初始化助手池
+
+        Args:
+            idle_timeout: 助手最长空闲时间（秒）
+            max_idle_per_key: 每个键最多保留的空闲助手数
+        """
+        self.idle_timeout = idle_timeout
+        self.max_idle_per_key = max_idle_per_key
+        self._idle: Dict[Tuple[str, str], List[Tuple[float, 'Assistant']]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self, api_key: str = None, llm_cfg: Dict[str, Any] = None) -> Iterator['Assistant']:
+        """借出一个助手，退出上下文时归还
+
+        Args:
+            api_key: DashScope API Key，默认读取环境变量
+            llm_cfg: LLM配置，默认为LOG_ANALYZER_LLM_CFG
+        """
+        api_key = api_key or os.getenv('DASHSCOPE_API_KEY')
+        llm_cfg = llm_cfg or LOG_ANALYZER_LLM_CFG
+        key = (api_key or '', json.dumps(llm_cfg, sort_keys=True))
+
+        bot = None
+        with self._lock:
+            self._evict_idle()
+            idle_bots = self._idle.get(key)
+            if idle_bots:
+                _, bot = idle_bots.pop()
+        if bot is None:
+            bot = create_log_analyzer(api_key, llm_cfg)
+
+        try:
+            yield bot
+        finally:
+            with self._lock:
+                idle_bots = self._idle.setdefault(key, [])
+                if len(idle_bots) < self.max_idle_per_key:
+                    idle_bots.append((time.time(), bot))
+
+    def clear(self):
+        """清空所有空闲助手"""
+        with self._lock:
+            self._idle.clear()
+
+    def _evict_idle(self):
+        """淘汰空闲超时的助手，调用方需持有锁"""
+        expire_before = time.time() - self.idle_timeout
+        for key in list(self._idle):
+            idle_bots = [item for item in self._idle[key] if item[0] >= expire_before]
+            if idle_bots:
+                self._idle[key] = idle_bots
+            else:
+                del self._idle[key]
+
+ASSISTANT_POOL = AssistantPool()
+
 def analyze_logs(log_file: str, api_key: str = None, output_dir: str = "analysis_results") -> Dict[str, Any]:
     """分析日志文件并返回分析结果"""
+    from qwen_agent.utils.output_beautify import typewriter_print
+
     try:
-        bot = create_log_analyzer(api_key)
-        
-        # 构建分析请求
-        messages = [{
-            'role': 'user',
-            'content': f'请分析这个日志文件：{log_file}'
-        }]
-
-        # 执行分析
-        response = []
-        response_plain_text = ''
-        print('开始分析日志...')
-        
-        for resp in bot.run(messages=messages):
-            response_plain_text = typewriter_print(resp, response_plain_text)
-            response.extend(resp)
+        with ASSISTANT_POOL.acquire(api_key) as bot:
+            # 构建分析请求
+            messages = [{
+                'role': 'user',
+                'content': f'请分析这个日志文件：{log_file}'
+            }]
+
+            # 执行分析
+            response = []
+            response_plain_text = ''
+            print('开始分析日志...')
+            
+            for resp in bot.run(messages=messages):
+                response_plain_text = typewriter_print(resp, response_plain_text)
+                response.extend(resp)
 
         # 尝试解析分析结果中的结构化数据
         try:
@@ -209,35 +503,65 @@ def analyze_logs(log_file: str, api_key: str = None, output_dir: str = "analysis
             'analysis': ''
         }
 
+def _latest_answer(messages: List[Any]) -> Tuple[Any, str]:
+    """返回最后一条助手回答消息的下标和正文；最后一条消息不是回答正文时返回(None, '')"""
+    if not messages:
+        return None, ''
+    message = messages[-1]
+    if message.get('role') != 'assistant' or message.get('function_call'):
+        return None, ''
+    content = message.get('content')
+    if not isinstance(content, str):
+        return None, ''
+    return len(messages) - 1, content
+
 def analyze_logs_stream(log_file: str, api_key: str = None, output_dir: str = "analysis_results"):
     """流式分析日志文件，分阶段yield分析结果"""
+    from qwen_agent.utils.output_beautify import typewriter_print
+
     try:
-        bot = create_log_analyzer(api_key)
-        messages = [{
-            'role': 'user',
-            'content': f'请分析这个日志文件：{log_file}'
-        }]
-        response_plain_text = ''
-        # 流式获取LLM输出
-        for resp in bot.run(messages=messages):
-            response_plain_text = typewriter_print(resp, response_plain_text)
-            # 尝试解析结构化数据
-            try:
-                analysis_data = json.loads(response_plain_text)
-                # 每个阶段单独yield
-                if 'performance_metrics' in analysis_data:
-                    yield {'step': '性能指标', 'data': analysis_data['performance_metrics']}
-                if 'error_distribution' in analysis_data:
-                    yield {'step': '错误分析', 'data': analysis_data['error_distribution']}
-                if 'request_patterns' in analysis_data:
-                    yield {'step': '请求模式', 'data': analysis_data['request_patterns']}
-                if 'resource_usage' in analysis_data:
-                    yield {'step': '资源使用', 'data': analysis_data['resource_usage']}
-                if 'cost_analysis' in analysis_data:
-                    yield {'step': '成本分析', 'data': analysis_data['cost_analysis']}
-                break  # 只yield一次完整结构化数据即可
-            except Exception:
-                # 还未到结构化数据阶段，继续流式输出文本
+        # 助手在整个流式过程中被独占，生成器结束或被关闭时归还到助手池
+        with ASSISTANT_POOL.acquire(api_key) as bot:
+            messages = [{
+                'role': 'user',
+                'content': f'请分析这个日志文件：{log_file}'
+            }]
+            response_plain_text = ''
+            parser = IncrementalJSONParser()
+            answer_index, answer_length, answer_tail = None, 0, ''
+            section_seen = finished = False
+            for resp in bot.run(messages=messages):
+                response_plain_text = typewriter_print(resp, response_plain_text)
+                # 只把助手的回答正文交给增量解析器，工具调用参数和工具返回结果不参与解析
+                index, content = _latest_answer(resp)
+                if index is not None:
+                    # 流式输出的正文逐步增长，只比较长度和已解析部分的最后一个字符，
+                    # 每次更新的开销与新增文本而不是全文长度成正比
+                    if (index != answer_index or len(content) < answer_length
+                            or content[answer_length - 1:answer_length] != answer_tail):
+                        # 进入新的回答消息或正文被改写，从头解析
+                        parser = IncrementalJSONParser()
+                        answer_index, answer_length = index, 0
+                    delta = content[answer_length:]
+                    answer_length = len(content)
+                    answer_tail = content[-1:]
+                    while delta:
+                        # 每个字段完整后立即单独yield
+                        for key, value in parser.feed(delta):
+                            if key in ANALYSIS_SECTION_STEPS:
+                                section_seen = True
+                                yield {'step': ANALYSIS_SECTION_STEPS[key], 'data': value}
+                        if not parser.done:
+                            break
+                        if section_seen:
+                            finished = True  # 分析结果的顶层结构化数据已完整
+                            break
+                        # 完整的对象中没有分析结果，用新的解析器继续解析剩余文本
+                        delta = parser.remainder
+                        parser = IncrementalJSONParser()
+                    if finished:
+                        break
+                # 结构化数据尚未完整，继续流式输出文本
                 yield {'step': 'llm_output', 'data': response_plain_text}
     except Exception as e:
         yield {'step': 'error', 'data': str(e)}
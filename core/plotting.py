@@ -0,0 +1,39 @@
+import os
+import sys
+from functools import lru_cache
+
+
+def is_headless() -> bool:
+    """判断当前进程是否运行在无图形界面的环境中
+
+    设置环境变量HEADLESS=1可强制按无界面处理；已通过MPLBACKEND指定后端时不做判断。
+    """
+    if os.environ.get('HEADLESS') == '1':
+        return True
+    if os.environ.get('MPLBACKEND'):
+        return False
+    return sys.platform.startswith('linux') and not (
+        os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+
+
+@lru_cache(maxsize=None)
+def load_plotting():
+    """按需加载绘图依赖
+
+    matplotlib、seaborn和pandas只在第一次绘图时导入，无界面环境下强制使用Agg后端，
+    并设置中文字体。
+
+    Returns:
+        tuple: (matplotlib.pyplot, seaborn, pandas)
+    """
+    import matplotlib
+    if is_headless():
+        matplotlib.use('Agg', force=True)
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    import pandas as pd
+
+    # 设置中文字体
+    plt.rcParams['font.sans-serif'] = ['SimHei']
+    plt.rcParams['axes.unicode_minus'] = False
+    return plt, sns, pd
@@ -36,6 +36,13 @@ LOG_ANALYSIS_PROMPT = """
 4. 内容必须是原始日志的一部分
 """
 
+LOG_TEMPLATE_ANALYSIS_PROMPT = LOG_ANALYSIS_PROMPT + """
+注意：本次输入的"text"不是原始日志，而是经过模板归并后的日志模板，每行格式为：
+[次数=N] 日志级别 源文件:行号] 模板内容 | 首次=首次出现时间 末次=末次出现时间 | 样例变量=[[...], ...]
+其中模板内容里的<*>表示变量位置，样例变量给出了若干条原始日志在这些位置上的取值。
+请把每个模板视为N条同类日志进行分析，"content"字段填写模板内容，"timestamp"字段可填写首次出现时间。
+"""
+
 LOG_SUMMARY_PROMPT = """
 请根据以下日志分析结果生成一份总结报告。
 
@@ -0,0 +1,232 @@
+import time
+import codecs
+import socket
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Tuple
+
+import paramiko
+
+
+class SSHConnectionPool:
+    """进程级SSH连接池
+
+    按主机、端口、用户名和密码摘要缓存已认证的连接，重复执行命令时跳过握手和认证。
+    连接开启keepalive，借用前做健康检查，空闲超过idle_timeout秒的连接会被关闭。
+    同一连接上的多条命令通过独立的channel复用底层transport，可以并发执行。
+    """
+
+    def __init__(self, idle_timeout: float = 300, keepalive_interval: int = 30,
+                 connect_timeout: float = 5):
+        """初始化连接池
+
+        Args:
+            idle_timeout: 连接最长空闲时间（秒）
+            keepalive_interval: keepalive间隔（秒）
+            connect_timeout: 建立连接的超时时间（秒）
+        """
+        self.idle_timeout = idle_timeout
+        self.keepalive_interval = keepalive_interval
+        self.connect_timeout = connect_timeout
+        self._clients: Dict[Tuple, paramiko.SSHClient] = {}
+        self._last_used: Dict[Tuple, float] = {}
+        self._in_use: Dict[Tuple, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _make_key(host: str, port: int, username: str, password: str) -> Tuple:
+        # 键中包含密码摘要，未提供正确密码的会话无法复用他人的连接
+        password_digest = hashlib.sha256((password or '').encode('utf-8')).hexdigest()
+        return (host, int(port), username, password_digest)
+
+    def get_client(self, host: str, port: int, username: str, password: str) -> paramiko.SSHClient:
+        """获取一个健康的已认证连接，必要时新建"""
+        key = self._make_key(host, port, username, password)
+        with self._lock:
+            self._evict_idle()
+            client = self._clients.get(key)
+        if client is not None:
+            if self._is_healthy(client):
+                with self._lock:
+                    self._last_used[key] = time.time()
+                return client
+            self._close_key(key)
+
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        client.connect(host, port=int(port), username=username, password=password,
+                       timeout=self.connect_timeout)
+        client.get_transport().set_keepalive(self.keepalive_interval)
+        with self._lock:
+            previous = self._clients.get(key)
+            if previous is not None and self._is_healthy(previous):
+                # 其他线程已抢先建立连接，复用已有连接
+                client.close()
+                client = previous
+            else:
+                self._clients[key] = client
+            self._last_used[key] = time.time()
+        if previous is not None and previous is not client:
+            previous.close()
+        return client
+
+    def run_command(self, host: str, port: int, username: str, password: str, command: str,
+                    on_output: Callable[[str], None] = None, timeout: float = None) -> int:
+        """在远程主机上执行命令，并流式回调输出
+
+        Args:
+            host: 主机地址
+            port: 端口
+            username: 用户名
+            password: 密码
+            command: 要执行的命令
+            on_output: 输出回调，每收到一段输出（stdout与stderr合并）调用一次
+            timeout: 命令执行超时时间（秒），默认不限制
+
+        Returns:
+            int: 命令退出码
+
+        Raises:
+            TimeoutError: 命令执行超时
+        """
+        key = self._make_key(host, port, username, password)
+        client = self.get_client(host, port, username, password)
+        with self._lock:
+            # 有命令在执行的连接不会被当作空闲连接淘汰
+            self._in_use[key] = self._in_use.get(key, 0) + 1
+        try:
+            channel = client.get_transport().open_session()
+        except Exception:
+            self._release(key)
+            raise
+        try:
+            channel.set_combine_stderr(True)
+            channel.settimeout(0.1)
+            channel.exec_command(command)
+            deadline = time.time() + timeout if timeout else None
+            # 增量解码，避免多字节字符被recv的块边界截断后变成乱码
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            while True:
+                try:
+                    data = channel.recv(32768)
+                except socket.timeout:
+                    data = None
+                if data:
+                    text = decoder.decode(data)
+                    if on_output and text:
+                        on_output(text)
+                elif data == b'' or (channel.exit_status_ready() and not channel.recv_ready()):
+                    break
+                if deadline and time.time() > deadline:
+                    raise TimeoutError(f"命令执行超时（{timeout}秒）: {command}")
+            text = decoder.decode(b'', final=True)
+            if on_output and text:
+                on_output(text)
+            return channel.recv_exit_status()
+        finally:
+            channel.close()
+            self._release(key)
+
+    def run_on_hosts(self, hosts: List[Tuple[str, int]], username: str, password: str, command: str,
+                     max_parallel: int = 20, timeout: float = None,
+                     on_result: Callable[[Dict[str, Any]], None] = None) -> List[Dict[str, Any]]:
+        """在多台主机上并发执行同一条命令
+
+        Args:
+            hosts: (主机地址, 端口) 列表
+            username: 用户名
+            password: 密码
+            command: 要执行的命令
+            max_parallel: 最大并发主机数
+            timeout: 每台主机的命令执行超时时间（秒）
+            on_result: 每台主机执行完成时在调用线程中回调一次，用于刷新进度
+
+        Returns:
+            List[Dict[str, Any]]: 每台主机的执行结果，按完成顺序排列，包含host、port、status
+                （success/failed/timeout/error）、exit_code、duration和output
+        """
+        results = []
+        with ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(hosts) or 1))) as executor:
+            futures = [executor.submit(self._run_on_host, host, port, username, password, command, timeout)
+                       for host, port in hosts]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if on_result:
+                    on_result(result)
+        return results
+
+    def _run_on_host(self, host: str, port: int, username: str, password: str, command: str,
+                     timeout: float = None) -> Dict[str, Any]:
+        """在单台主机上执行命令并汇总结果，不抛出异常"""
+        output_chunks = []
+        exit_code = None
+        start_time = time.time()
+        try:
+            exit_code = self.run_command(host, port, username, password, command,
+                                         on_output=output_chunks.append, timeout=timeout)
+            status = 'success' if exit_code == 0 else 'failed'
+        except TimeoutError:
+            status = 'timeout'
+        except Exception as e:
+            status = 'error'
+            output_chunks.append(str(e))
+        return {
+            'host': host,
+            'port': int(port),
+            'status': status,
+            'exit_code': exit_code,
+            'duration': time.time() - start_time,
+            'output': ''.join(output_chunks)
+        }
+
+    def close(self, host: str, port: int, username: str, password: str):
+        """关闭指定连接"""
+        self._close_key(self._make_key(host, port, username, password))
+
+    def close_all(self):
+        """关闭所有连接"""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._last_used.clear()
+        for client in clients:
+            client.close()
+
+    def _release(self, key: Tuple):
+        """命令结束后归还连接"""
+        with self._lock:
+            self._in_use[key] -= 1
+            if not self._in_use[key]:
+                del self._in_use[key]
+            self._last_used[key] = time.time()
+
+    def _close_key(self, key: Tuple):
+        with self._lock:
+            client = self._clients.pop(key, None)
+            self._last_used.pop(key, None)
+        if client is not None:
+            client.close()
+
+    def _is_healthy(self, client: paramiko.SSHClient) -> bool:
+        """检查连接是否仍然可用"""
+        transport = client.get_transport()
+        if transport is None or not transport.is_active() or not transport.is_authenticated():
+            return False
+        try:
+            transport.send_ignore()
+        except (paramiko.SSHException, OSError, EOFError):
+            return False
+        return True
+
+    def _evict_idle(self):
+        """关闭空闲超时的连接，调用方需持有锁"""
+        expire_before = time.time() - self.idle_timeout
+        for key, client in list(self._clients.items()):
+            if self._in_use.get(key):
+                continue
+            if self._last_used.get(key, 0) < expire_before:
+                del self._clients[key]
+                self._last_used.pop(key, None)
+                client.close()
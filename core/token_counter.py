@@ -0,0 +1,160 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from kbx.common.logging import logger
+
+# 模型名称关键字到HuggingFace分词器的映射，按顺序匹配
+MODEL_TOKENIZERS = [
+    ('deepseek', 'deepseek-ai/DeepSeek-V3'),
+    ('qwen', 'Qwen/Qwen2.5-7B-Instruct'),
+]
+
+# 超过该长度的文本以摘要作为缓存键，避免缓存持有大段文本
+_MAX_KEY_LENGTH = 256
+
+# tiktoken的cl100k_base编码文件地址，tiktoken按其sha1在缓存目录中保存下载结果
+_TIKTOKEN_BLOB_URL = 'https://openaipublic.blob.core.windows.net/encodings/cl100k_base.tiktoken'
+
+
+def _download_allowed() -> bool:
+    return os.environ.get('TOKENIZER_ALLOW_DOWNLOAD') == '1'
+
+
+def _tiktoken_cached() -> bool:
+    """判断cl100k_base编码文件是否已在tiktoken的本地缓存中"""
+    cache_dir = os.environ.get('TIKTOKEN_CACHE_DIR') or os.environ.get('DATA_GYM_CACHE_DIR')
+    if cache_dir is None:
+        import tempfile
+        cache_dir = os.path.join(tempfile.gettempdir(), 'data-gym-cache')
+    if not cache_dir:
+        return False
+    cache_key = hashlib.sha1(_TIKTOKEN_BLOB_URL.encode()).hexdigest()
+    return os.path.exists(os.path.join(cache_dir, cache_key))
+
+
+def _resolve_tokenizer_name(model_name: Optional[str]) -> Optional[str]:
+    """根据环境变量TOKENIZER_PATH或模型名称确定分词器"""
+    tokenizer_name = os.environ.get('TOKENIZER_PATH')
+    if tokenizer_name or not model_name:
+        return tokenizer_name
+    lower_name = model_name.lower()
+    for keyword, name in MODEL_TOKENIZERS:
+        if keyword in lower_name:
+            return name
+    return None
+
+
+class TokenCountingService:
+    """带缓存的批量token计数服务
+
+    优先使用模型对应的真实分词器（transformers），其次使用tiktoken，都不可用时回退到KBX的估算计数器。
+    分词器默认只从本地加载，设置TOKENIZER_ALLOW_DOWNLOAD=1时才允许下载。
+    重复出现的文本从有界LRU缓存中直接返回，count_batch对未命中的文本做一次批量编码。
+    实例可以像函数一样调用，替代原有的token_counter。
+    """
+
+    def __init__(self, model_name: str = None, cache_size: int = 50000):
+        """初始化token计数服务
+
+        Args:
+            model_name: 大模型名称，用于选择分词器
+            cache_size: 缓存的最大条目数
+        """
+        self.model_name = model_name
+        self.cache_size = cache_size
+        self.backend = 'estimated'
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._batch_encode: Callable[[List[str]], List[int]] = self._load_backend()
+
+    def _load_backend(self) -> Callable[[List[str]], List[int]]:
+        """加载分词器，返回批量计数函数"""
+        tokenizer_name = _resolve_tokenizer_name(self.model_name)
+        if tokenizer_name:
+            try:
+                from transformers import AutoTokenizer
+
+                # 默认只使用本地已有的分词器，设置TOKENIZER_ALLOW_DOWNLOAD=1时允许下载
+                tokenizer = AutoTokenizer.from_pretrained(
+                    tokenizer_name, trust_remote_code=True,
+                    local_files_only=not _download_allowed())
+                self.backend = f'transformers:{tokenizer_name}'
+                return lambda texts: [
+                    len(ids) for ids in tokenizer(texts, add_special_tokens=False)['input_ids']]
+            except Exception as e:
+                logger.warning(f"加载分词器{tokenizer_name}失败，改用其他计数方式: {e}")
+
+        # tiktoken首次使用时会下载编码文件，同样只在允许下载或本地已有缓存时使用
+        if _download_allowed() or _tiktoken_cached():
+            try:
+                import tiktoken
+
+                encoding = tiktoken.get_encoding('cl100k_base')
+                self.backend = 'tiktoken:cl100k_base'
+                return lambda texts: [len(ids) for ids in encoding.encode_ordinary_batch(texts)]
+            except Exception as e:
+                logger.warning(f"加载tiktoken编码失败，改用估算计数: {e}")
+
+        from kbx.common.token_counter.token_counter_factory import get_token_counter
+        from kbx.common.types import TokenCounterConfig
+
+        estimated_counter = get_token_counter(TokenCounterConfig(counter="estimated"))
+        self.backend = 'estimated'
+        return lambda texts: [estimated_counter(text) for text in texts]
+
+    @staticmethod
+    def _cache_key(text: str) -> str:
+        if len(text) <= _MAX_KEY_LENGTH:
+            return text
+        return hashlib.sha1(text.encode('utf-8')).hexdigest() + str(len(text))
+
+    def __call__(self, text: str) -> int:
+        return self.count(text)
+
+    def count(self, text: str) -> int:
+        """统计单个文本的token数"""
+        return self.count_batch([text])[0]
+
+    def count_batch(self, texts: List[str], use_cache: bool = True) -> List[int]:
+        """批量统计token数，未命中缓存的文本去重后一次性编码
+
+        Args:
+            texts: 文本列表
+            use_cache: 是否读写缓存。日志行等几乎不会重复的文本应传False，直接批量编码
+
+        Returns:
+            List[int]: 与输入顺序一致的token数
+        """
+        if not texts:
+            return []
+        if not use_cache:
+            return self._batch_encode(list(texts))
+        keys = [self._cache_key(text) for text in texts]
+        counts: Dict[str, int] = {}
+        missing: Dict[str, str] = {}
+        with self._lock:
+            for key, text in zip(keys, texts):
+                count = self._cache.get(key)
+                if count is None:
+                    missing[key] = text
+                else:
+                    self._cache.move_to_end(key)
+                    counts[key] = count
+
+        if missing:
+            missing_counts = self._batch_encode(list(missing.values()))
+            with self._lock:
+                for key, count in zip(missing, missing_counts):
+                    counts[key] = count
+                    self._cache[key] = count
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return [counts[key] for key in keys]
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._cache.clear()
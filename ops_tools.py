@@ -1,5 +1,79 @@
+import html
+import time
+import pandas as pd
 import streamlit as st
-import paramiko
+
+from core.ssh_pool import SSHConnectionPool
+
+@st.cache_resource(show_spinner=False)
+def get_ssh_pool() -> SSHConnectionPool:
+    """进程级SSH连接池，跨Streamlit会话和重跑复用"""
+    return SSHConnectionPool()
+
+def parse_host_list(text: str, default_port: int = 22) -> list:
+    """解析主机列表，每行一个"主机"或"主机:端口"，忽略空行和#开头的注释"""
+    hosts = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        host, _, port = line.rpartition(':') if ':' in line else (line, '', '')
+        hosts.append((host, int(port) if port else default_port))
+    return hosts
+
+def render_batch_mode():
+    """批量执行：同一条命令在多台主机上并发执行，结果汇总为可排序表格"""
+    st.markdown('<div class="ssh-card">', unsafe_allow_html=True)
+    st.subheader("批量执行命令")
+    host_text = st.text_area("主机列表", "127.0.0.1", height=150,
+                             help='每行一个主机，格式为"主机"或"主机:端口"')
+    col1, col2 = st.columns(2)
+    with col1:
+        username = st.text_input("用户名", "root", key="batch_username")
+        max_parallel = st.number_input("最大并发数", value=20, min_value=1, max_value=200)
+    with col2:
+        password = st.text_input("密码", type="password", key="batch_password")
+        timeout = st.number_input("单台超时（秒）", value=30, min_value=1, max_value=3600)
+    cmd = st.text_input("输入要执行的命令", "uptime", key="batch_cmd")
+
+    if st.button("批量执行", key="batch_exec_btn", use_container_width=True):
+        try:
+            hosts = parse_host_list(host_text)
+        except ValueError as e:
+            st.error(f"主机列表格式错误: {e}")
+            hosts = []
+        if not hosts:
+            st.error("请填写主机列表")
+        elif not password:
+            st.error("请填写密码")
+        else:
+            progress = st.progress(0.0, text=f"0/{len(hosts)} 台主机已完成")
+            completed = [0]
+
+            def update_progress(result: dict):
+                completed[0] += 1
+                progress.progress(completed[0] / len(hosts), text=f"{completed[0]}/{len(hosts)} 台主机已完成")
+
+            start_time = time.time()
+            results = get_ssh_pool().run_on_hosts(hosts, username, password, cmd, max_parallel=int(max_parallel),
+                                                  timeout=timeout, on_result=update_progress)
+            st.session_state['batch_results'] = results
+            st.success(f"批量执行完成，共 {len(hosts)} 台主机，总耗时 {time.time() - start_time:.2f} 秒")
+
+    results = st.session_state.get('batch_results')
+    if results:
+        df = pd.DataFrame([{
+            '主机': r['host'],
+            '端口': r['port'],
+            '状态': r['status'],
+            '退出码': r['exit_code'],
+            '耗时(秒)': round(r['duration'], 3),
+            '输出': r['output']
+        } for r in results])
+        st.dataframe(df, use_container_width=True, hide_index=True)
+        status_counts = df['状态'].value_counts().to_dict()
+        st.caption("，".join(f"{status}: {count}" for status, count in status_counts.items()))
+    st.markdown('</div>', unsafe_allow_html=True)
 
 st.title("运维工具 - SSH连接服务器")
 
@@ -21,6 +95,9 @@ st.markdown("""
     font-family: monospace;
     color: #334155;
     margin-top: 10px;
+    white-space: pre-wrap;
+    max-height: 480px;
+    overflow-y: auto;
 }
 .ssh-btn {
     width: 100%;
@@ -44,7 +121,11 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-if not st.session_state.get('ssh_connected'):
+mode = st.radio("执行模式", ["单台主机", "批量执行"], horizontal=True, key="ops_mode")
+
+if mode == "批量执行":
+    render_batch_mode()
+elif not st.session_state.get('ssh_connected'):
     with st.container():
         st.markdown('<div class="ssh-card">', unsafe_allow_html=True)
         st.subheader("服务器信息")
@@ -59,34 +140,47 @@ if not st.session_state.get('ssh_connected'):
                 st.error("请填写密码")
             else:
                 try:
-                    ssh = paramiko.SSHClient()
-                    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-                    ssh.connect(host, port=port, username=username, password=password, timeout=5)
+                    # 连接建立后保留在连接池中，后续执行命令直接复用
+                    get_ssh_pool().get_client(host, port, username, password)
                     st.success(f"成功连接到 {host}:{port}")
                     st.session_state['ssh_connected'] = True
                     st.session_state['ssh_info'] = {'host': host, 'port': port, 'username': username, 'password': password}
-                    ssh.close()
                 except Exception as e:
                     st.session_state['ssh_connected'] = False
                     st.error(f"连接失败: {e}")
         st.markdown('</div>', unsafe_allow_html=True)
 else:
     if st.button("断开连接", type="secondary", use_container_width=True):
+        info = st.session_state['ssh_info']
+        get_ssh_pool().close(info['host'], info['port'], info['username'], info['password'])
         st.session_state['ssh_connected'] = False
         st.experimental_rerun()
     st.markdown('<div class="ssh-card">', unsafe_allow_html=True)
     st.subheader("远程命令执行")
     cmd = st.text_input("输入要执行的命令", "ls -l")
     if st.button("执行命令", key="exec_btn", use_container_width=True):
+        output_placeholder = st.empty()
+        output_chunks = []
+        last_render = [0.0]
+
+        def render_output():
+            text = "".join(output_chunks) or "（无输出）"
+            output_placeholder.markdown(f'<div class="ssh-result">{html.escape(text)}</div>', unsafe_allow_html=True)
+
+        def show_output(chunk: str):
+            # 边接收边刷新输出，限制刷新频率，避免大量输出时反复渲染
+            output_chunks.append(chunk)
+            if time.time() - last_render[0] >= 0.2:
+                render_output()
+                last_render[0] = time.time()
+
         try:
-            ssh = paramiko.SSHClient()
-            ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
             info = st.session_state['ssh_info']
-            ssh.connect(info['host'], port=info['port'], username=info['username'], password=info['password'], timeout=5)
-            stdin, stdout, stderr = ssh.exec_command(cmd)
-            result = stdout.read().decode() + stderr.read().decode()
-            st.markdown(f'<div class="ssh-result">{result}</div>', unsafe_allow_html=True)
-            ssh.close()
+            exit_code = get_ssh_pool().run_command(info['host'], info['port'], info['username'], info['password'],
+                                                   cmd, on_output=show_output)
+            render_output()
+            if exit_code != 0:
+                st.warning(f"命令退出码: {exit_code}")
         except Exception as e:
             st.error(f"命令执行失败: {e}")
     st.markdown('</div>', unsafe_allow_html=True) 
\ No newline at end of file
@@ -5,6 +5,10 @@ import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import random
 import json
+import os
+
+from core.log_reader import LogLineIndex, read_tail_lines
+from core.log_templates import KLOG_HEADER_PATTERN
 
 # 设置页面配置
 st.set_page_config(
@@ -355,7 +359,18 @@ if 'page' not in st.session_state:
 # 页面内容
 page = st.session_state.page
 
+# 缓存配置：模拟实时指标短时缓存，静态数据和图表长时缓存，日志读取结果以文件签名为键
+METRICS_CACHE_TTL = 10
+STATIC_DATA_CACHE_TTL = 3600
+LOG_CACHE_TTL = 600
+
+def file_signature(path: str) -> tuple:
+    """文件签名，作为缓存键的一部分，文件被修改、追加或轮转后缓存自动失效"""
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
 # 模拟数据生成函数
+@st.cache_data(ttl=METRICS_CACHE_TTL, show_spinner=False)
 def generate_metrics():
     return {
         "系统健康度": random.randint(85, 100),
@@ -364,6 +379,7 @@ def generate_metrics():
         "AI修复成功率": random.randint(80, 95)
     }
 
+@st.cache_data(ttl=STATIC_DATA_CACHE_TTL, show_spinner=False)
 def generate_deployment_data():
     dates = pd.date_range(start='2024-01-01', end='2024-03-15', freq='D')
     return pd.DataFrame({
@@ -372,6 +388,105 @@ def generate_deployment_data():
         'success_rate': [random.uniform(0.95, 1.0) for _ in range(len(dates))]
     })
 
+@st.cache_data(ttl=METRICS_CACHE_TTL, show_spinner=False)
+def generate_system_metrics():
+    return {
+        "CPU使用率": random.randint(20, 80),
+        "内存使用率": random.randint(30, 90),
+        "磁盘使用率": random.randint(40, 85),
+        "网络流量": random.randint(100, 1000)
+    }
+
+@st.cache_data(ttl=STATIC_DATA_CACHE_TTL, show_spinner=False)
+def build_deployment_figure():
+    """部署趋势图，与部署数据同步缓存"""
+    df = generate_deployment_data()
+    return px.line(df, x='date', y='deployments', title='每日部署数量')
+
+@st.cache_data(ttl=STATIC_DATA_CACHE_TTL, max_entries=256, show_spinner=False)
+def build_gauge_figure(metric: str, value: int):
+    """监控仪表盘图，按指标名称和数值缓存"""
+    return go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=value,
+        title={'text': metric},
+        gauge={'axis': {'range': [0, 100]},
+               'bar': {'color': "darkblue"},
+               'steps': [
+                   {'range': [0, 50], 'color': "lightgray"},
+                   {'range': [50, 80], 'color': "gray"},
+                   {'range': [80, 100], 'color': "darkgray"}
+               ]}))
+
+@st.cache_resource(show_spinner=False)
+def get_log_index(log_file: str) -> LogLineIndex:
+    """获取日志文件的行偏移索引，进程内缓存，跨会话和重跑复用"""
+    return LogLineIndex(log_file)
+
+def match_severity(line: str, severities: tuple) -> bool:
+    """判断日志行是否属于指定的klog日志级别"""
+    return not severities or (line[:1] in severities and KLOG_HEADER_PATTERN.match(line) is not None)
+
+@st.cache_data(ttl=LOG_CACHE_TTL, max_entries=64, show_spinner=False)
+def load_log_tail(log_file: str, signature: tuple, count: int, severities: tuple, max_scan_lines: int) -> list:
+    """读取末尾日志，signature变化时重新读取"""
+    return read_tail_lines(log_file, count, predicate=lambda line: match_severity(line, severities),
+                           max_scan_lines=max_scan_lines)
+
+@st.cache_data(ttl=LOG_CACHE_TTL, max_entries=64, show_spinner=False)
+def load_log_page(log_file: str, signature: tuple, start_line: int, page_size: int,
+                  severities: tuple, max_scan_lines: int) -> list:
+    """按行号读取一页日志，signature变化时重新读取"""
+    index = get_log_index(log_file)
+    if not severities:
+        return list(index.iter_lines(start_line, start_line + page_size))
+    # 从起始行向后扫描，直到凑满一页或达到扫描上限
+    numbered_lines = []
+    for line_no, line in index.iter_lines(start_line, start_line + max_scan_lines):
+        if match_severity(line, severities):
+            numbered_lines.append((line_no, line))
+            if len(numbered_lines) >= page_size:
+                break
+    return numbered_lines
+
+def render_log_explorer(log_file: str, max_scan_lines: int = 100000):
+    """日志浏览器：默认倒序读取末尾日志，支持分页、按行跳转和日志级别过滤，不加载整个文件"""
+    index = get_log_index(log_file).refresh()
+    total_lines = index.line_count
+
+    col1, col2, col3 = st.columns([2, 2, 1])
+    with col1:
+        view_mode = st.radio("浏览方式", ["最新日志", "按行浏览"], horizontal=True, key="log_view_mode")
+    with col2:
+        severities = st.multiselect("日志级别", ["I", "W", "E", "F"], key="log_severities",
+                                    help="I: 信息, W: 警告, E: 错误, F: 致命")
+    with col3:
+        page_size = st.selectbox("每页行数", [100, 200, 500], key="log_page_size")
+
+    signature = file_signature(log_file)
+    if view_mode == "最新日志":
+        lines = load_log_tail(log_file, signature, page_size, tuple(severities), max_scan_lines)
+        st.caption(f"共 {total_lines} 行，显示末尾 {len(lines)} 行")
+        st.text_area("日志内容", '\n'.join(lines), height=300)
+        return
+
+    page_count = max((total_lines + page_size - 1) // page_size, 1)
+    col1, col2 = st.columns(2)
+    with col1:
+        page = st.number_input("页码", min_value=1, max_value=page_count, value=page_count, key="log_page")
+    with col2:
+        jump_line = st.number_input("跳转到行号", min_value=0, max_value=total_lines, value=0, key="log_jump_line",
+                                    help="为0时按页码浏览")
+    start_line = jump_line - 1 if jump_line > 0 else (page - 1) * page_size
+
+    numbered_lines = load_log_page(log_file, signature, start_line, page_size, tuple(severities), max_scan_lines)
+
+    if numbered_lines:
+        st.caption(f"共 {total_lines} 行，显示第 {numbered_lines[0][0] + 1} - {numbered_lines[-1][0] + 1} 行中的 {len(numbered_lines)} 行")
+    else:
+        st.caption(f"共 {total_lines} 行，没有符合条件的日志")
+    st.text_area("日志内容", '\n'.join(f"{line_no + 1:>7} | {line}" for line_no, line in numbered_lines), height=300)
+
 # 修复历史模拟数据
 repair_history = [
     {
@@ -429,9 +544,7 @@ if page == "仪表盘":
     
     # 部署趋势图
     st.subheader("部署趋势")
-    df = generate_deployment_data()
-    fig = px.line(df, x='date', y='deployments', title='每日部署数量')
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(build_deployment_figure(), use_container_width=True)
     
     # 最近告警
     st.subheader("最近告警")
@@ -476,29 +589,13 @@ elif page == "系统监控":
     
     # 实时监控指标
     st.subheader("实时监控指标")
-    metrics = {
-        "CPU使用率": random.randint(20, 80),
-        "内存使用率": random.randint(30, 90),
-        "磁盘使用率": random.randint(40, 85),
-        "网络流量": random.randint(100, 1000)
-    }
+    metrics = generate_system_metrics()
     
     # 创建仪表盘
     cols = st.columns(4)
     for i, (metric, value) in enumerate(metrics.items()):
         with cols[i]:
-            fig = go.Figure(go.Indicator(
-                mode="gauge+number",
-                value=value,
-                title={'text': metric},
-                gauge={'axis': {'range': [0, 100]},
-                       'bar': {'color': "darkblue"},
-                       'steps': [
-                           {'range': [0, 50], 'color': "lightgray"},
-                           {'range': [50, 80], 'color': "gray"},
-                           {'range': [80, 100], 'color': "darkgray"}
-                       ]}))
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(build_gauge_figure(metric, value), use_container_width=True)
     
     # 异常检测结果
     st.subheader("AI异常检测")
@@ -550,10 +647,7 @@ elif page == "AI修复中心":
     st.markdown('<div class="log-preview">', unsafe_allow_html=True)
     st.subheader("日志预览")
     try:
-        with open(log_file, 'r', encoding='utf-8') as f:
-            log_content = f.read()
-            last_lines = log_content.split('\n')[-100:]
-            st.text_area("日志内容", '\n'.join(last_lines), height=300)
+        render_log_explorer(log_file)
     except Exception as e:
         st.error(f"无法读取日志文件: {str(e)}")
     st.markdown('</div>', unsafe_allow_html=True)
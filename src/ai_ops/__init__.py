@@ -3,12 +3,17 @@ AetherOps AI运维模块
 提供智能运维、故障诊断和自动修复功能
 """
 
-from .core.engine import AIOpsEngine
-from .agents.sre_agent import SREAgent
-from .agents.code_agent import CodeAgent
-from .agents.report_agent import ReportAgent
-from .agents.vis_agent import VisAgent
-from .agents.data_agent import DataAgent
+import importlib
+
+# 按需导入：访问对应名称时才加载模块，避免导入包时加载所有Agent及numpy、scikit-learn等重量级依赖
+_LAZY_IMPORTS = {
+    'AIOpsEngine': '.core.engine',
+    'SREAgent': '.agents.sre_agent',
+    'CodeAgent': '.agents.code_agent',
+    'ReportAgent': '.agents.report_agent',
+    'VisAgent': '.agents.vis_agent',
+    'DataAgent': '.agents.data_agent'
+}
 
 __all__ = [
     'AIOpsEngine',
@@ -17,4 +22,17 @@ __all__ = [
     'ReportAgent',
     'VisAgent',
     'DataAgent'
-] 
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
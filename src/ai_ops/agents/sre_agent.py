@@ -3,15 +3,36 @@ SRE Agent
 负责系统可靠性工程相关的分析和处理
 """
 
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional
 import logging
-import numpy as np
-from sklearn.ensemble import IsolationForest
+import time
+
+if TYPE_CHECKING:
+    from ..core.anomaly_registry import AnomalyModelRegistry
+    from ..core.online_detector import OnlineAnomalyDetector
 
 class SREAgent:
-    def __init__(self):
+    def __init__(self, anomaly_registry: Optional["AnomalyModelRegistry"] = None):
         self.logger = logging.getLogger(__name__)
-        self.anomaly_detector = IsolationForest(contamination=0.1)
+        # numpy与scikit-learn只在首次做异常检测时加载，告警处理等路径无需付出导入开销
+        self._anomaly_registry = anomaly_registry
+        self._online_detector = None
+    
+    @property
+    def anomaly_registry(self) -> "AnomalyModelRegistry":
+        """异常检测模型注册表，首次访问时创建"""
+        if self._anomaly_registry is None:
+            from ..core.anomaly_registry import AnomalyModelRegistry
+            self._anomaly_registry = AnomalyModelRegistry()
+        return self._anomaly_registry
+    
+    @property
+    def online_detector(self) -> "OnlineAnomalyDetector":
+        """在线异常检测器，首次访问时创建"""
+        if self._online_detector is None:
+            from ..core.online_detector import OnlineAnomalyDetector
+            self._online_detector = OnlineAnomalyDetector()
+        return self._online_detector
         
     def analyze(self, data: Dict) -> Dict:
         """
@@ -80,21 +101,51 @@ class SREAgent:
             "details": {}
         }
     
+    def fit_anomaly_models(self, metrics: Dict) -> Dict[str, bool]:
+        """
+        在训练窗口上批量训练异常检测模型
+        
+        Args:
+            metrics: 指标名称到训练窗口数据的映射
+            
+        Returns:
+            Dict[str, bool]: 每个指标是否训练成功
+        """
+        import numpy as np
+        
+        return self.anomaly_registry.fit_many({
+            metric_name: values for metric_name, values in metrics.items()
+            if isinstance(values, (list, np.ndarray))
+        })
+    
     def detect_anomalies(self, metrics: Dict) -> List[Dict]:
         """
         检测异常
         
+        已训练且未过期的模型只对新数据打分，模型缺失或到期时用之前累积的历史数据重新训练。
+        没有可用模型（未调用fit_anomaly_models且历史数据不足min_train_size）的指标不做检测，
+        只记录日志，其数据会计入历史，累积足够后自动训练
+        
         Args:
             metrics: 指标数据
             
         Returns:
             List[Dict]: 异常列表
         """
+        import numpy as np
+        
         anomalies = []
         for metric_name, values in metrics.items():
             if isinstance(values, (list, np.ndarray)):
+                values = np.asarray(values, dtype=float).reshape(-1)
                 # 使用隔离森林检测异常
-                predictions = self.anomaly_detector.fit_predict(values.reshape(-1, 1))
+                model, predictions, _ = self.anomaly_registry.score(metric_name, values)
+                if model is None:
+                    self.logger.info(
+                        f"指标{metric_name}暂无可用的异常检测模型，跳过本次检测（已累积"
+                        f"{self.anomaly_registry.history_size(metric_name)}个历史数据点，"
+                        f"训练至少需要{self.anomaly_registry.min_train_size}个）")
+                    continue
                 anomaly_indices = np.where(predictions == -1)[0]
                 
                 for idx in anomaly_indices:
@@ -102,11 +153,35 @@ class SREAgent:
                         "metric": metric_name,
                         "timestamp": idx,
                         "value": values[idx],
-                        "severity": "high" if abs(values[idx] - np.mean(values)) > 2 * np.std(values) else "medium"
+                        "severity": "high" if abs(values[idx] - model.mean) > 2 * model.std else "medium"
                     })
         
         return anomalies
     
+    def detect_stream_anomalies(self, sample: Dict[str, float], timestamp: Optional[float] = None) -> List[Dict]:
+        """
+        流式异常检测，每次接收各指标的一个新数据点，不重新处理历史数据
+        
+        Args:
+            sample: 指标名称到最新数据点的映射
+            timestamp: 数据点时间戳，默认为当前时间
+            
+        Returns:
+            List[Dict]: 本次数据点中的异常列表
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        return [
+            {
+                "metric": result["metric"],
+                "timestamp": timestamp,
+                "value": result["value"],
+                "score": result["score"],
+                "severity": result["severity"]
+            }
+            for result in self.online_detector.update_many(sample)
+            if result["is_anomaly"]
+        ]
+    
     def _analyze_logs(self, logs: List[str]) -> Dict:
         """分析日志"""
         # TODO: 实现日志分析逻辑
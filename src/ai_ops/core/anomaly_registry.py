@@ -0,0 +1,193 @@
+"""
+异常检测模型注册表
+按指标名称管理隔离森林模型：批量训练一次，之后只对新数据打分，并按计划用最近的历史数据重新训练
+"""
+
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from sklearn.ensemble import IsolationForest
+
+
+class AnomalyModel:
+    """单个指标的异常检测模型及其训练窗口统计信息"""
+
+    def __init__(self, model: "IsolationForest", fitted_at: float, mean: float, std: float,
+                 train_scores: np.ndarray):
+        self.model = model
+        self.fitted_at = fitted_at
+        self.mean = mean
+        self.std = std
+        self.train_scores = train_scores
+
+
+class AnomalyModelRegistry:
+    def __init__(self, model_dir: Optional[str] = None, contamination: float = 0.1,
+                 refit_interval: float = 3600, min_train_size: int = 10, score_cache_size: int = 1024,
+                 train_window_size: int = 1000):
+        """
+        初始化模型注册表
+
+        Args:
+            model_dir: 模型持久化目录，默认读取环境变量ANOMALY_MODEL_DIR，未设置时只保存在内存中
+            contamination: 隔离森林的异常比例
+            refit_interval: 模型重新训练的间隔（秒）
+            min_train_size: 训练所需的最少样本数
+            score_cache_size: 打分结果缓存的最大条目数
+            train_window_size: 每个指标保留的最近历史数据点数，重新训练时以此为训练窗口（只保存在内存中）
+        """
+        self.logger = logging.getLogger(__name__)
+        self.model_dir = model_dir or os.environ.get('ANOMALY_MODEL_DIR')
+        self.contamination = contamination
+        self.refit_interval = refit_interval
+        self.min_train_size = min_train_size
+        self.score_cache_size = score_cache_size
+        self.train_window_size = train_window_size
+        self._models: Dict[str, AnomalyModel] = {}
+        self._history: Dict[str, deque] = {}
+        self._score_cache: "OrderedDict[Tuple[str, float, str], Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        if self.model_dir:
+            os.makedirs(self.model_dir, exist_ok=True)
+
+    def fit(self, metric_name: str, values) -> Optional[AnomalyModel]:
+        """
+        在训练窗口上训练指标的异常检测模型
+
+        Args:
+            metric_name: 指标名称
+            values: 训练窗口数据
+
+        Returns:
+            Optional[AnomalyModel]: 训练好的模型；样本不足时返回None
+        """
+        from sklearn.ensemble import IsolationForest
+
+        values = np.asarray(values, dtype=float).reshape(-1)
+        if len(values) < self.min_train_size:
+            return None
+        # 训练窗口同时作为之后重新训练的历史数据
+        self._history[metric_name] = deque(values[-self.train_window_size:].tolist(),
+                                           maxlen=self.train_window_size)
+        model = IsolationForest(contamination=self.contamination)
+        samples = values.reshape(-1, 1)
+        model.fit(samples)
+        anomaly_model = AnomalyModel(
+            model=model,
+            fitted_at=time.time(),
+            mean=float(np.mean(values)),
+            std=float(np.std(values)),
+            train_scores=model.decision_function(samples)
+        )
+        self._models[metric_name] = anomaly_model
+        self._save(metric_name, anomaly_model)
+        return anomaly_model
+
+    def fit_many(self, metrics: Dict[str, object]) -> Dict[str, bool]:
+        """
+        批量训练多个指标的模型
+
+        Args:
+            metrics: 指标名称到训练窗口数据的映射
+
+        Returns:
+            Dict[str, bool]: 每个指标是否训练成功
+        """
+        return {name: self.fit(name, values) is not None for name, values in metrics.items()}
+
+    def get(self, metric_name: str) -> Optional[AnomalyModel]:
+        """获取指标的模型，内存中没有时尝试从磁盘加载"""
+        model = self._models.get(metric_name)
+        if model is None:
+            model = self._load(metric_name)
+            if model is not None:
+                self._models[metric_name] = model
+        return model
+
+    def needs_refit(self, metric_name: str) -> bool:
+        """模型不存在或已超过重新训练间隔"""
+        model = self.get(metric_name)
+        return model is None or time.time() - model.fitted_at > self.refit_interval
+
+    def due_for_refit(self) -> List[str]:
+        """返回已到重新训练时间的指标列表"""
+        return [name for name in list(self._models) if self.needs_refit(name)]
+
+    def history_size(self, metric_name: str) -> int:
+        """指标当前保留的历史数据点数"""
+        history = self._history.get(metric_name)
+        return len(history) if history is not None else 0
+
+    def score(self, metric_name: str, values, refit_if_due: bool = True) -> Tuple[Optional[AnomalyModel], np.ndarray, np.ndarray]:
+        """
+        对新数据打分，不重新训练已有的有效模型
+
+        模型缺失或到期时，只用本批数据之前的历史数据重新训练，避免模型在待打分的数据上自我拟合；
+        打分后本批数据再追加到历史中。历史数据不足min_train_size时无法训练，
+        没有可用模型的指标返回的模型为None，预测结果全部视为正常。
+
+        Args:
+            metric_name: 指标名称
+            values: 待打分的数据
+            refit_if_due: 模型缺失或过期时，是否用最近的历史数据重新训练
+
+        Returns:
+            Tuple[Optional[AnomalyModel], np.ndarray, np.ndarray]: (模型, 预测结果(-1为异常), 异常分数)
+        """
+        values = np.asarray(values, dtype=float).reshape(-1)
+        if refit_if_due and self.needs_refit(metric_name) and self.history_size(metric_name) >= self.min_train_size:
+            self.fit(metric_name, np.fromiter(self._history[metric_name], dtype=float))
+        model = self.get(metric_name)
+        self._history.setdefault(metric_name, deque(maxlen=self.train_window_size)).extend(values.tolist())
+        if model is None or len(values) == 0:
+            return model, np.ones(len(values), dtype=int), np.zeros(len(values))
+
+        cache_key = (metric_name, model.fitted_at, hashlib.sha1(values.tobytes()).hexdigest())
+        cached = self._score_cache.get(cache_key)
+        if cached is not None:
+            self._score_cache.move_to_end(cache_key)
+            return model, cached[0], cached[1]
+
+        samples = values.reshape(-1, 1)
+        scores = model.model.decision_function(samples)
+        predictions = np.where(scores < 0, -1, 1)
+        self._score_cache[cache_key] = (predictions, scores)
+        if len(self._score_cache) > self.score_cache_size:
+            self._score_cache.popitem(last=False)
+        return model, predictions, scores
+
+    def _model_path(self, metric_name: str) -> str:
+        file_name = hashlib.sha1(metric_name.encode('utf-8')).hexdigest()
+        return os.path.join(self.model_dir, f"{file_name}.joblib")
+
+    def _save(self, metric_name: str, model: AnomalyModel):
+        """持久化模型"""
+        if not self.model_dir:
+            return
+        import joblib
+
+        try:
+            joblib.dump(model, self._model_path(metric_name))
+        except Exception as e:
+            self.logger.warning(f"保存异常检测模型失败 {metric_name}: {e}")
+
+    def _load(self, metric_name: str) -> Optional[AnomalyModel]:
+        """从磁盘加载模型"""
+        if not self.model_dir:
+            return None
+        path = self._model_path(metric_name)
+        if not os.path.exists(path):
+            return None
+        import joblib
+
+        try:
+            return joblib.load(path)
+        except Exception as e:
+            self.logger.warning(f"加载异常检测模型失败 {metric_name}: {e}")
+            return None
@@ -4,21 +4,40 @@ AI运维引擎核心类
 """
 
 from typing import Dict, List, Optional
+from functools import cached_property
 import logging
-from ..agents.sre_agent import SREAgent
-from ..agents.code_agent import CodeAgent
-from ..agents.report_agent import ReportAgent
-from ..agents.vis_agent import VisAgent
-from ..agents.data_agent import DataAgent
+from .pipeline import PipelineExecutor, PipelineStage
 
 class AIOpsEngine:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
-        self.sre_agent = SREAgent()
-        self.code_agent = CodeAgent()
-        self.report_agent = ReportAgent()
-        self.vis_agent = VisAgent()
-        self.data_agent = DataAgent()
+        self.pipeline_executor = PipelineExecutor()
+    
+    # Agent在首次使用时才导入并创建，只处理告警的调用方不会加载其余Agent及其依赖
+    @cached_property
+    def sre_agent(self):
+        from ..agents.sre_agent import SREAgent
+        return SREAgent()
+    
+    @cached_property
+    def code_agent(self):
+        from ..agents.code_agent import CodeAgent
+        return CodeAgent()
+    
+    @cached_property
+    def report_agent(self):
+        from ..agents.report_agent import ReportAgent
+        return ReportAgent()
+    
+    @cached_property
+    def vis_agent(self):
+        from ..agents.vis_agent import VisAgent
+        return VisAgent()
+    
+    @cached_property
+    def data_agent(self):
+        from ..agents.data_agent import DataAgent
+        return DataAgent()
         
     def analyze_incident(self, incident_data: Dict) -> Dict:
         """
@@ -30,26 +49,26 @@ class AIOpsEngine:
         Returns:
             Dict: 分析结果
         """
-        # 1. 数据预处理
-        processed_data = self.data_agent.preprocess(incident_data)
-        
-        # 2. SRE分析
-        sre_analysis = self.sre_agent.analyze(processed_data)
-        
-        # 3. 代码分析
-        code_analysis = self.code_agent.analyze(sre_analysis)
-        
-        # 4. 生成报告
-        report = self.report_agent.generate_report(sre_analysis, code_analysis)
-        
-        # 5. 可视化
-        visualization = self.vis_agent.visualize(report)
+        run = self.pipeline_executor.run([
+            # 1. 数据预处理
+            PipelineStage("processed_data", lambda: self.data_agent.preprocess(incident_data)),
+            # 2. SRE分析
+            PipelineStage("analysis", self.sre_agent.analyze, ["processed_data"]),
+            # 3. 代码分析
+            PipelineStage("code_analysis", self.code_agent.analyze, ["analysis"]),
+            # 4. 生成报告
+            PipelineStage("report", self.report_agent.generate_report, ["analysis", "code_analysis"]),
+            # 5. 可视化
+            PipelineStage("visualization", self.vis_agent.visualize, ["report"])
+        ])
+        results = run["results"]
         
         return {
-            "analysis": sre_analysis,
-            "code_analysis": code_analysis,
-            "report": report,
-            "visualization": visualization
+            "analysis": results["analysis"],
+            "code_analysis": results["code_analysis"],
+            "report": results["report"],
+            "visualization": results["visualization"],
+            "stage_timings": run["timings"]
         }
     
     def handle_alert(self, alert_data: Dict) -> Dict:
@@ -62,23 +81,24 @@ class AIOpsEngine:
         Returns:
             Dict: 处理结果
         """
-        # 1. 告警分析
-        alert_analysis = self.sre_agent.analyze_alert(alert_data)
-        
-        # 2. 生成处理方案
-        solution = self.code_agent.generate_solution(alert_analysis)
-        
-        # 3. 执行处理
-        result = self.sre_agent.execute_solution(solution)
-        
-        # 4. 生成报告
-        report = self.report_agent.generate_alert_report(alert_analysis, result)
+        run = self.pipeline_executor.run([
+            # 1. 告警分析
+            PipelineStage("alert_analysis", lambda: self.sre_agent.analyze_alert(alert_data)),
+            # 2. 生成处理方案
+            PipelineStage("solution", self.code_agent.generate_solution, ["alert_analysis"]),
+            # 3. 执行处理
+            PipelineStage("result", self.sre_agent.execute_solution, ["solution"]),
+            # 4. 生成报告
+            PipelineStage("report", self.report_agent.generate_alert_report, ["alert_analysis", "result"])
+        ])
+        results = run["results"]
         
         return {
-            "alert_analysis": alert_analysis,
-            "solution": solution,
-            "result": result,
-            "report": report
+            "alert_analysis": results["alert_analysis"],
+            "solution": results["solution"],
+            "result": results["result"],
+            "report": results["report"],
+            "stage_timings": run["timings"]
         }
     
     def monitor_system(self, metrics: Dict) -> Dict:
@@ -91,21 +111,21 @@ class AIOpsEngine:
         Returns:
             Dict: 监控结果
         """
-        # 1. 指标分析
-        metrics_analysis = self.data_agent.analyze_metrics(metrics)
-        
-        # 2. 异常检测
-        anomalies = self.sre_agent.detect_anomalies(metrics_analysis)
-        
-        # 3. 生成监控报告
-        report = self.report_agent.generate_monitoring_report(metrics_analysis, anomalies)
-        
-        # 4. 可视化
-        visualization = self.vis_agent.visualize_metrics(metrics_analysis, anomalies)
+        run = self.pipeline_executor.run([
+            # 1. 指标分析
+            PipelineStage("metrics_analysis", lambda: self.data_agent.analyze_metrics(metrics)),
+            # 2. 异常检测
+            PipelineStage("anomalies", self.sre_agent.detect_anomalies, ["metrics_analysis"]),
+            # 3. 生成监控报告与可视化，二者互不依赖，并发执行
+            PipelineStage("report", self.report_agent.generate_monitoring_report, ["metrics_analysis", "anomalies"]),
+            PipelineStage("visualization", self.vis_agent.visualize_metrics, ["metrics_analysis", "anomalies"])
+        ])
+        results = run["results"]
         
         return {
-            "metrics_analysis": metrics_analysis,
-            "anomalies": anomalies,
-            "report": report,
-            "visualization": visualization
-        } 
\ No newline at end of file
+            "metrics_analysis": results["metrics_analysis"],
+            "anomalies": results["anomalies"],
+            "report": results["report"],
+            "visualization": results["visualization"],
+            "stage_timings": run["timings"]
+        }
@@ -0,0 +1,144 @@
+"""
+在线异常检测器
+基于EWMA均值与方差的流式z-score检测，每个数据点O(1)更新，支持多条指标序列的向量化更新
+"""
+
+from typing import Dict, List, Optional
+import numpy as np
+
+
+class OnlineAnomalyDetector:
+    def __init__(self, alpha: float = 0.05, threshold: float = 3.0, high_threshold: float = 5.0,
+                 warmup: int = 10, initial_capacity: int = 64, min_std: float = 1e-9,
+                 min_relative_std: float = 1e-3):
+        """
+        初始化在线异常检测器
+
+        Args:
+            alpha: EWMA平滑系数，越大对近期数据越敏感
+            threshold: 判定为异常的z-score阈值
+            high_threshold: 判定为高严重性异常的z-score阈值
+            warmup: 每条序列在开始判定异常前需要的样本数
+            initial_capacity: 状态数组的初始容量
+            min_std: 计算z-score时标准差的绝对下限
+            min_relative_std: 计算z-score时标准差相对于|均值|的下限。方差为0的平稳序列
+                按max(min_std, min_relative_std * |均值|)计算，出现偏离时仍能判定为异常
+        """
+        self.alpha = alpha
+        self.threshold = threshold
+        self.high_threshold = high_threshold
+        self.warmup = warmup
+        self.min_std = min_std
+        self.min_relative_std = min_relative_std
+        self._index: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._mean = np.zeros(initial_capacity)
+        self._var = np.zeros(initial_capacity)
+        self._count = np.zeros(initial_capacity, dtype=np.int64)
+
+    @property
+    def series(self) -> List[str]:
+        """已跟踪的指标序列名称"""
+        return list(self._names)
+
+    def state(self, metric_name: str) -> Optional[Dict]:
+        """返回指标序列当前的均值、标准差和样本数"""
+        idx = self._index.get(metric_name)
+        if idx is None:
+            return None
+        return {
+            "mean": float(self._mean[idx]),
+            "std": float(np.sqrt(self._var[idx])),
+            "count": int(self._count[idx])
+        }
+
+    def reset(self, metric_name: Optional[str] = None):
+        """重置指定序列的状态，未指定时重置全部序列"""
+        if metric_name is None:
+            self._mean[:] = 0
+            self._var[:] = 0
+            self._count[:] = 0
+            return
+        idx = self._index.get(metric_name)
+        if idx is not None:
+            self._mean[idx] = 0
+            self._var[idx] = 0
+            self._count[idx] = 0
+
+    def update(self, metric_name: str, value: float) -> Dict:
+        """
+        更新单条序列并判定当前数据点
+
+        Args:
+            metric_name: 指标名称
+            value: 新数据点
+
+        Returns:
+            Dict: 判定结果，包含metric、value、score和is_anomaly
+        """
+        return self.update_many({metric_name: value})[0]
+
+    def update_many(self, samples: Dict[str, float]) -> List[Dict]:
+        """
+        向量化更新多条序列，每条序列各接收一个新数据点
+
+        Args:
+            samples: 指标名称到新数据点的映射
+
+        Returns:
+            List[Dict]: 与输入顺序一致的判定结果，包含metric、value、score和is_anomaly
+        """
+        if not samples:
+            return []
+        names = list(samples)
+        indices = np.fromiter((self._get_index(name) for name in names), dtype=np.int64, count=len(names))
+        values = np.asarray([samples[name] for name in names], dtype=float)
+
+        mean = self._mean[indices]
+        var = self._var[indices]
+        count = self._count[indices]
+        # 标准差设置下限，平稳序列（方差为0）之后的第一个尖刺也能得到有效的z-score
+        std = np.maximum(np.sqrt(var), np.maximum(self.min_std, self.min_relative_std * np.abs(mean)))
+
+        first = count == 0
+        scores = np.where(first, 0.0, np.abs(values - mean) / std)
+        is_anomaly = (count >= self.warmup) & (scores > self.threshold)
+
+        # 异常点按阈值截断后再参与更新，避免单个尖刺把基线拉偏
+        bound = self.threshold * std
+        clipped = np.where(is_anomaly, np.clip(values, mean - bound, mean + bound), values)
+        delta = clipped - mean
+        new_mean = np.where(first, clipped, mean + self.alpha * delta)
+        new_var = np.where(first, 0.0, (1 - self.alpha) * (var + self.alpha * delta * delta))
+
+        self._mean[indices] = new_mean
+        self._var[indices] = new_var
+        self._count[indices] = count + 1
+
+        return [
+            {
+                "metric": name,
+                "value": float(values[i]),
+                "score": float(scores[i]),
+                "is_anomaly": bool(is_anomaly[i]),
+                "severity": "high" if scores[i] > self.high_threshold else "medium"
+            }
+            for i, name in enumerate(names)
+        ]
+
+    def _get_index(self, metric_name: str) -> int:
+        """获取序列在状态数组中的下标，新序列按需扩容"""
+        idx = self._index.get(metric_name)
+        if idx is None:
+            idx = len(self._names)
+            if idx >= len(self._mean):
+                capacity = len(self._mean) * 2
+                self._mean = np.resize(self._mean, capacity)
+                self._var = np.resize(self._var, capacity)
+                self._count = np.resize(self._count, capacity)
+                self._mean[idx:] = 0
+                self._var[idx:] = 0
+                self._count[idx:] = 0
+            self._index[metric_name] = idx
+            self._names.append(metric_name)
+        return idx
@@ -0,0 +1,118 @@
+"""
+流水线DAG执行器
+按依赖关系调度各Agent阶段，互不依赖的阶段并发执行，并记录每个阶段的耗时
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class PipelineStage:
+    def __init__(self, name: str, func: Callable[..., Any], depends_on: Sequence[str] = ()):
+        """
+        定义流水线阶段
+
+        Args:
+            name: 阶段名称，同时作为结果字典中的键
+            func: 阶段函数，按depends_on的顺序接收上游阶段的输出作为位置参数
+            depends_on: 依赖的上游阶段名称
+        """
+        self.name = name
+        self.func = func
+        self.depends_on = list(depends_on)
+
+
+class PipelineExecutor:
+    def __init__(self, max_workers: int = 4):
+        """
+        初始化执行器
+
+        Args:
+            max_workers: 最大并发阶段数
+        """
+        self.logger = logging.getLogger(__name__)
+        self.max_workers = max_workers
+
+    def run(self, stages: List[PipelineStage]) -> Dict[str, Any]:
+        """
+        执行流水线
+
+        Args:
+            stages: 阶段列表
+
+        Returns:
+            Dict[str, Any]: 包含results（各阶段输出）和timings（各阶段耗时，秒）
+
+        Raises:
+            ValueError: 阶段名称重复、依赖不存在或存在循环依赖
+            Exception: 任一阶段抛出的异常，其余未开始的阶段会被取消
+        """
+        stage_map = self._validate(stages)
+        results: Dict[str, Any] = {}
+        timings: Dict[str, float] = {}
+        pending = dict(stage_map)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for name, stage in list(pending.items()):
+                    if all(dep in results for dep in stage.depends_on):
+                        args = [results[dep] for dep in stage.depends_on]
+                        running[executor.submit(self._run_stage, stage, args)] = name
+                        del pending[name]
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name], timings[name] = future.result()
+                    except Exception:
+                        for other in running:
+                            other.cancel()
+                        raise
+
+        self.logger.debug(f"流水线阶段耗时: {timings}")
+        return {"results": results, "timings": timings}
+
+    def _run_stage(self, stage: PipelineStage, args: List[Any]):
+        """执行单个阶段并计时"""
+        start_time = time.perf_counter()
+        try:
+            result = stage.func(*args)
+        except Exception as e:
+            self.logger.error(f"流水线阶段 {stage.name} 执行失败: {e}")
+            raise
+        return result, time.perf_counter() - start_time
+
+    @staticmethod
+    def _validate(stages: List[PipelineStage]) -> Dict[str, PipelineStage]:
+        """校验阶段名称唯一、依赖存在且无环"""
+        stage_map: Dict[str, PipelineStage] = {}
+        for stage in stages:
+            if stage.name in stage_map:
+                raise ValueError(f"流水线阶段名称重复: {stage.name}")
+            stage_map[stage.name] = stage
+        for stage in stages:
+            for dep in stage.depends_on:
+                if dep not in stage_map:
+                    raise ValueError(f"阶段 {stage.name} 依赖的阶段不存在: {dep}")
+
+        visited: Dict[str, int] = {}
+
+        def visit(name: str, path: Optional[List[str]] = None):
+            state = visited.get(name)
+            if state == 2:
+                return
+            path = (path or []) + [name]
+            if state == 1:
+                raise ValueError(f"流水线存在循环依赖: {' -> '.join(path)}")
+            visited[name] = 1
+            for dep in stage_map[name].depends_on:
+                visit(dep, path)
+            visited[name] = 2
+
+        for name in stage_map:
+            visit(name)
+        return stage_map
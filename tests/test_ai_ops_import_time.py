@@ -0,0 +1,42 @@
+"""
+ai_ops启动开销回归测试
+告警处理等短生命周期的调用方不应加载numpy、scikit-learn，且启动耗时需在预算之内
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+# 导入包、创建引擎并处理一条告警的耗时预算（秒），不含解释器自身的启动时间
+STARTUP_BUDGET = float(os.environ.get('AI_OPS_STARTUP_BUDGET', '0.5'))
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import ai_ops
+engine = ai_ops.AIOpsEngine()
+engine.sre_agent.analyze_alert({"name": "HighCPU", "severity": "critical"})
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "elapsed": elapsed,
+    "heavy": [name for name in ("numpy", "sklearn", "joblib") if name in sys.modules]
+}))
+"""
+
+
+def run_probe():
+    result = subprocess.run([sys.executable, '-c', PROBE], cwd=SRC_DIR,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_alert_path_does_not_import_numpy_or_sklearn():
+    assert run_probe()["heavy"] == []
+
+
+def test_alert_path_startup_within_budget():
+    elapsed = run_probe()["elapsed"]
+    assert elapsed < STARTUP_BUDGET, f"启动耗时{elapsed:.3f}秒，超过预算{STARTUP_BUDGET}秒"
@@ -0,0 +1,91 @@
+"""
+知识库增量更新测试
+使用内存中的假知识库验证upsert不会产生重复文档
+"""
+
+import pytest
+
+pytest.importorskip('kbx')
+
+from kbx.common.types import KBXError  # noqa: E402
+
+from core.base_processor import BaseProcessor  # noqa: E402
+
+
+class FakeDocInfo:
+    def __init__(self, doc_id):
+        self.doc_id = doc_id
+        self.err_info = type('ErrInfo', (), {'code': KBXError.Code.SUCCESS})()
+
+
+class FakeKB:
+    """只实现upsert用到的接口，文档以doc_id到文件路径的映射保存"""
+
+    kb_id = 'fake-kb'
+
+    def __init__(self, docs=None):
+        self.docs = dict(docs or {})
+        self._next_id = 0
+
+    def list_doc_ids(self):
+        return list(self.docs), len(self.docs)
+
+    def insert_docs(self, file_list):
+        results = []
+        for file_path in file_list:
+            self._next_id += 1
+            doc_id = f'doc-{self._next_id}'
+            self.docs[doc_id] = file_path
+            results.append(FakeDocInfo(doc_id))
+        return results
+
+    def remove_docs(self, doc_ids):
+        for doc_id in doc_ids:
+            self.docs.pop(doc_id)
+
+
+@pytest.fixture
+def processor(tmp_path, monkeypatch):
+    monkeypatch.setenv('KB_MANIFEST_DIR', str(tmp_path / 'manifests'))
+    processor = BaseProcessor.__new__(BaseProcessor)
+    processor.root_dir = str(tmp_path)
+    return processor
+
+
+@pytest.fixture
+def kb_config():
+    return type('KBConfig', (), {'name': 'test-kb'})()
+
+
+def test_first_upsert_on_existing_kb_without_manifest_replaces_untracked_docs(tmp_path, processor, kb_config):
+    doc_path = tmp_path / 'docs'
+    doc_path.mkdir()
+    (doc_path / 'a.md').write_text('a')
+    (doc_path / 'b.md').write_text('b')
+    # 由rebuild模式创建的知识库，没有upsert清单
+    processor._kb = FakeKB({'old-a': str(doc_path / 'a.md'), 'old-b': str(doc_path / 'b.md')})
+
+    processor._upsert_knowledge_base(kb_config, str(doc_path))
+
+    assert sorted(processor._kb.docs.values()) == [str(doc_path / 'a.md'), str(doc_path / 'b.md')]
+    assert 'old-a' not in processor._kb.docs and 'old-b' not in processor._kb.docs
+
+    # 再次upsert时内容未变化，不插入也不删除
+    docs = dict(processor._kb.docs)
+    processor._upsert_knowledge_base(kb_config, str(doc_path))
+    assert processor._kb.docs == docs
+
+
+def test_upsert_replaces_changed_doc(tmp_path, processor, kb_config):
+    doc_path = tmp_path / 'docs'
+    doc_path.mkdir()
+    (doc_path / 'a.md').write_text('a')
+    processor._kb = FakeKB()
+    processor._upsert_knowledge_base(kb_config, str(doc_path))
+    (old_doc_id,) = processor._kb.docs
+
+    (doc_path / 'a.md').write_text('a2')
+    processor._upsert_knowledge_base(kb_config, str(doc_path))
+
+    assert len(processor._kb.docs) == 1
+    assert old_doc_id not in processor._kb.docs
@@ -0,0 +1,36 @@
+"""
+在线异常检测器测试
+"""
+
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from ai_ops.core.online_detector import OnlineAnomalyDetector  # noqa: E402
+
+
+@pytest.mark.parametrize('baseline', [0.0, 100.0])
+def test_flat_series_then_spike_is_flagged(baseline):
+    detector = OnlineAnomalyDetector(warmup=10)
+    for _ in range(50):
+        result = detector.update('cpu', baseline)
+        assert not result['is_anomaly']
+        assert result['score'] == 0.0
+
+    result = detector.update('cpu', baseline + 5)
+    assert result['is_anomaly']
+    assert result['severity'] == 'high'
+    # 异常点截断后参与更新，基线不会被尖刺拉偏
+    assert detector.state('cpu')['mean'] == pytest.approx(baseline, abs=1)
+
+
+def test_flat_series_spike_not_flagged_during_warmup():
+    detector = OnlineAnomalyDetector(warmup=10)
+    for _ in range(5):
+        detector.update('cpu', 1.0)
+    assert not detector.update('cpu', 50.0)['is_anomaly']